@@ -1,48 +1,256 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g
 from flask_cors import CORS
 from model import FakeNewsDetector, fetch_recent_news
 from news_fetcher import NewsFetcher
+from article_index import SeenArticleIndex
+from micro_batcher import MicroBatcher, QueueFull
+from model_registry import ModelRegistry
+from snapshot_cache import SnapshotCache
+from feed_snapshot import FeedSnapshot
+from article_store import ArticleStore
+from event_stream import EventBroadcaster
+from body_scorer import BodyScorer
+import metrics
+import logging
+import os
 import threading
 import time
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the detector
-detector = FakeNewsDetector()
+logger = logging.getLogger(__name__)
 
-# Initialize the news fetcher
-news_fetcher = NewsFetcher()
+REFRESH_SECONDS = metrics.histogram('fakenews_refresh_seconds', 'Time for one news feed refresh cycle')
+REFRESH_ERRORS = metrics.counter('fakenews_refresh_errors_total', 'News feed refresh cycles that failed')
+REQUEST_SECONDS = metrics.histogram('fakenews_http_request_seconds', 'HTTP request latency',
+                                    ('endpoint', 'status'))
 
-# Store recent news for real-time updates
+# Initialize the detector. DETECTOR_ENGINE=online selects the hashing
+# vectorizer + SGD model that can learn from /feedback; MODEL_DIR points
+# at another directory of trained models.
+detector = FakeNewsDetector(engine=os.environ.get('DETECTOR_ENGINE', 'tfidf'),
+                            model_dir=os.environ.get('MODEL_DIR', 'models'))
+
+# Watch the models directory and swap in retrained models without a
+# restart. MODEL_POLL_INTERVAL=0 disables the watcher; /admin/reload-model
+# still works. Set ADMIN_TOKEN to require it in an X-Admin-Token header.
+model_registry = ModelRegistry(detector, poll_interval=float(os.environ.get('MODEL_POLL_INTERVAL', '30')))
+model_registry.start()
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Initialize the news fetcher. Near-duplicate headlines from different
+# sources are merged before scoring; NEWS_DEDUP_THRESHOLD=0 turns this off.
+NEWS_DEDUP_THRESHOLD = float(os.environ.get('NEWS_DEDUP_THRESHOLD', '0.5'))
+# Every scored article is kept in a local SQLite database for history
+# and search
+article_store = ArticleStore(os.environ.get('ARTICLE_DB', 'data/news.db'))
+# A refresh waits up to NEWS_REFRESH_TIMEOUT seconds for the feeds; slower
+# ones contribute their last fetched articles until they answer
+NEWS_REFRESH_TIMEOUT = float(os.environ.get('NEWS_REFRESH_TIMEOUT', '0.9'))
+news_fetcher = NewsFetcher(refresh_timeout=NEWS_REFRESH_TIMEOUT,
+                           dedup_threshold=NEWS_DEDUP_THRESHOLD or None, store=article_store)
+# NEWS_RSS_FEEDS (comma-separated URLs) replaces the default feeds and
+# NEWSAPI_KEY turns on NewsAPI; NEWSAPI_URL points it at another host,
+# e.g. the stub server used by benchmarks/run_suite.py
+if os.environ.get('NEWS_RSS_FEEDS'):
+    news_fetcher.rss_feeds = [url.strip() for url in os.environ['NEWS_RSS_FEEDS'].split(',') if url.strip()]
+if os.environ.get('NEWSAPI_KEY'):
+    news_fetcher.news_apis['newsapi'].update(key=os.environ['NEWSAPI_KEY'], enabled=True)
+if os.environ.get('NEWSAPI_URL'):
+    news_fetcher.news_apis['newsapi']['url'] = os.environ['NEWSAPI_URL']
+
+# Newly stored articles pushed to /stream clients, keyed by store id
+news_events = EventBroadcaster(max_events=int(os.environ.get('STREAM_BUFFER_SIZE', '1000')),
+                               start_id=article_store.last_id())
+STREAM_POLL_SECONDS = float(os.environ.get('STREAM_POLL_SECONDS', '2'))
+
+# Optional scoring of full article bodies, in the background so the
+# headline feed never waits on page downloads
+BODY_SCORING = os.environ.get('BODY_SCORING', '0') == '1'
+body_scorer = BodyScorer(
+    detector,
+    max_bytes=int(os.environ.get('BODY_MAX_BYTES', '2000000')),
+    deadline=float(os.environ.get('BODY_DEADLINE', '15'))
+) if BODY_SCORING else None
+
+# Most explanation terms a client may ask for per headline
+MAX_TOP_TERMS = 50
+
+# Upper bound on headlines accepted by /predict-batch in one request
+MAX_BATCH_SIZE = 10000
+
+# Opt-in micro-batching for /predict: concurrent single-headline requests
+# are queued for up to MICRO_BATCH_MAX_WAIT seconds and scored together
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '0') == '1'
+MICRO_BATCH_MAX_WAIT = float(os.environ.get('MICRO_BATCH_MAX_WAIT', '0.005'))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', '64'))
+MICRO_BATCH_MAX_QUEUE = int(os.environ.get('MICRO_BATCH_MAX_QUEUE', '1024'))
+
+batcher = None
+if MICRO_BATCHING:
+    batcher = MicroBatcher(detector.predict_batch,
+                           max_batch_size=MICRO_BATCH_MAX_SIZE,
+                           max_wait=MICRO_BATCH_MAX_WAIT,
+                           max_queue=MICRO_BATCH_MAX_QUEUE)
+
+# Labeled headlines from /feedback are folded into the online model once
+# FEEDBACK_BATCH_SIZE of them are pending
+FEEDBACK_BATCH_SIZE = int(os.environ.get('FEEDBACK_BATCH_SIZE', '32'))
+FEEDBACK_LABELS = {'fake': 0, 'real': 1, 0: 0, 1: 1}
+pending_feedback = []
+feedback_lock = threading.Lock()
+
+# Store recent news for real-time updates. The list is built in full and
+# then rebound, so readers always see a complete snapshot.
 recent_news = []
 
+# Predictions for articles already scored, so each refresh only sends new
+# or changed articles to the detector
+seen_articles = SeenArticleIndex()
+
+def score_articles(articles):
+    """Merge a prediction into each article, scoring only unseen ones"""
+    # Predictions made by a model that has since been swapped out are
+    # scored again
+    version = detector.bundle.version
+    predictions = [seen_articles.get(article) for article in articles]
+    new = [i for i, prediction in enumerate(predictions)
+           if prediction is None or prediction.get('model_version') != version]
+    if new:
+        results = detector.predict_batch([articles[i].get('title', '') for i in new])
+        for i, result in zip(new, results):
+            if 'error' not in result:
+                seen_articles.add(articles[i], result)
+            predictions[i] = result
+    return [{**article, **prediction} for article, prediction in zip(articles, predictions)]
+
+def refresh_news_feed():
+    """Fetch and score the latest articles and publish them as recent_news"""
+    global recent_news
+    try:
+        with REFRESH_SECONDS.time():
+            # Everything fetched is scored and stored; the newest ten are served
+            scored = score_articles(news_fetcher.fetch_latest_news())
+            recent_news = scored[:10]
+            try:
+                # Oldest first, so newer articles get higher ids
+                new_articles = article_store.add_many(scored[::-1])
+                news_events.publish(new_articles)
+                if body_scorer is not None:
+                    for article in new_articles:
+                        body_scorer.submit(article)
+            except Exception as e:
+                logger.exception(f"Could not store articles: {e}")
+            feed_snapshot.publish(recent_news)
+        return recent_news
+    except Exception:
+        REFRESH_ERRORS.inc()
+        raise
+
+# Scored feed served by /analyze-live. Requests never wait for upstream
+# feeds once a snapshot exists; a stale snapshot triggers one background
+# refresh that concurrent callers share.
+LIVE_NEWS_MAX_AGE = float(os.environ.get('LIVE_NEWS_MAX_AGE', '60'))
+live_news = SnapshotCache(refresh_news_feed, max_age=LIVE_NEWS_MAX_AGE)
+
+# Pre-serialized feed for /recent-news. With FEED_SNAPSHOT_PATH set, only
+# the worker holding the lock fetches and scores; the others serve the
+# snapshot it publishes to that file.
+feed_snapshot = FeedSnapshot(os.environ.get('FEED_SNAPSHOT_PATH'))
+FEED_LEADER_POLL = float(os.environ.get('FEED_LEADER_POLL', '15'))
+
 def update_news_feed():
     """Background task to update news feed"""
-    global recent_news
+    # Followers cannot ask the leader for a refresh, so a shared feed is
+    # kept no older than LIVE_NEWS_MAX_AGE
+    interval = 300 if feed_snapshot.path is None else LIVE_NEWS_MAX_AGE
+    while True:
+        if feed_snapshot.try_lead():
+            # Joins an on-demand refresh instead of fetching twice
+            live_news.refresh()
+            time.sleep(interval)
+        else:
+            # Take over if the leader exits
+            time.sleep(FEED_LEADER_POLL)
+
+def follow_news_events():
+    """Forward articles stored by the feed leader to this worker's /stream clients"""
     while True:
+        time.sleep(STREAM_POLL_SECONDS)
+        if feed_snapshot.is_leader:
+            # Our own refreshes publish directly
+            continue
         try:
-            articles = news_fetcher.fetch_latest_news()[:10]
-            recent_news = []
-            for article in articles:
-                # Use title for prediction
-                result = detector.predict(article.get('title', ''))
-                # Merge prediction with article metadata
-                merged = {**article, **result}
-                recent_news.append(merged)
+            news_events.publish(article_store.newer_than(news_events.last_id))
         except Exception as e:
-            print(f"Error updating news feed: {e}")
-        
-        time.sleep(300)  # Update every 5 minutes
+            logger.exception(f"Error reading new articles: {e}")
 
 # Start background news update
 news_thread = threading.Thread(target=update_news_feed, daemon=True)
 news_thread.start()
+if feed_snapshot.path is not None:
+    threading.Thread(target=follow_news_events, name='news-events', daemon=True).start()
+
+# Values kept by other components, read when /metrics is scraped
+for name, help_text, read in (
+    ('fakenews_cache_hits', 'Prediction cache hits', lambda: detector.cache.hits),
+    ('fakenews_cache_misses', 'Prediction cache misses', lambda: detector.cache.misses),
+    ('fakenews_cache_evictions', 'Prediction cache evictions', lambda: detector.cache.evictions),
+    ('fakenews_cache_size', 'Entries in the prediction cache', lambda: len(detector.cache)),
+    ('fakenews_seen_articles', 'Articles in the seen-article index', lambda: len(seen_articles)),
+    ('fakenews_model_reloads', 'Successful model reloads', lambda: model_registry.reloads),
+    ('fakenews_live_refreshes', 'Completed live news refreshes', lambda: live_news.refreshes),
+    ('fakenews_live_refreshes_coalesced', 'Refresh requests that joined one in flight',
+     lambda: live_news.coalesced),
+    ('fakenews_live_snapshot_age_seconds', 'Age of the live news snapshot', live_news.age),
+    ('fakenews_body_scores_pending', 'Article bodies being downloaded or scored',
+     lambda: body_scorer.stats()['pending'] if body_scorer else None),
+    ('fakenews_stream_subscribers', 'Connected /stream clients', lambda: news_events.subscribers),
+    ('fakenews_stream_events', 'Articles published to /stream', lambda: news_events.published),
+    ('fakenews_feed_leader', 'Whether this process fetches the news feed',
+     lambda: int(feed_snapshot.is_leader)),
+    ('fakenews_feed_snapshot_version', 'Version of the served news feed snapshot',
+     lambda: getattr(feed_snapshot.current(), 'version', None)),
+    ('fakenews_batcher_queue_depth', 'Requests waiting for the micro-batcher',
+     lambda: batcher.stats()['queue_depth'] if batcher else None),
+    ('fakenews_batcher_mean_batch_size', 'Mean micro-batch size',
+     lambda: batcher.stats()['mean_batch_size'] if batcher else None),
+):
+    metrics.gauge_callback(name, help_text, read)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of all counters and histograms"""
+    if not metrics.ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def explain_args(data):
+    """(explain, top_terms) from a request body; explanations are opt-in"""
+    # Only true or 1 turn them on; strings such as "false" or "0" do not
+    explain = data.get('explain') in (True, 1) or request.args.get('explain') == '1'
+    top_terms = data.get('top_terms', request.args.get('top_terms', 5, type=int))
+    if not isinstance(top_terms, int):
+        top_terms = 5
+    return explain, max(1, min(top_terms, MAX_TOP_TERMS))
+
 @app.route('/predict', methods=['POST'])
 def predict_headline():
     try:
@@ -52,28 +260,178 @@ def predict_headline():
         if not headline:
             return jsonify({'error': 'Please provide a headline'}), 400
         
-        result = detector.predict(headline)
+        explain, top_terms = explain_args(data)
+        if explain:
+            # Explanations are computed per request, outside the micro-batcher
+            result = detector.predict(headline, explain=True, top_terms=top_terms)
+        elif batcher is not None:
+            try:
+                result = batcher.submit(headline).result(timeout=30)
+            except QueueFull:
+                response = jsonify({'error': 'Server busy, please retry'})
+                response.headers['Retry-After'] = '1'
+                return response, 503
+        else:
+            result = detector.predict(headline)
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict-batch', methods=['POST'])
+def predict_headlines_batch():
+    try:
+        data = request.get_json(silent=True)
+        headlines = data.get('headlines') if isinstance(data, dict) else None
+
+        if not isinstance(headlines, list) or not headlines:
+            return jsonify({'error': 'Please provide a list of headlines'}), 400
+        if len(headlines) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} headlines per request'}), 413
+        if not all(isinstance(h, str) for h in headlines):
+            return jsonify({'error': 'Headlines must be strings'}), 400
+
+        explain, top_terms = explain_args(data)
+        results = detector.predict_batch([h.strip() for h in headlines], explain=explain, top_terms=top_terms)
+        return jsonify({'results': results, 'count': len(results)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/feedback', methods=['POST'])
+def submit_feedback():
+    """Accept moderator labels: {"items": [{"headline": ..., "label": "Fake"|"Real"}]}"""
+    try:
+        if detector.engine != 'online':
+            return jsonify({'error': 'Feedback requires DETECTOR_ENGINE=online'}), 409
+
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Please provide a list of labeled items'}), 400
+
+        labeled = []
+        for item in items:
+            headline = item.get('headline', '') if isinstance(item, dict) else ''
+            label = item.get('label') if isinstance(item, dict) else None
+            if isinstance(label, str):
+                label = label.lower()
+            if not isinstance(headline, str) or not headline.strip() or label not in FEEDBACK_LABELS:
+                return jsonify({'error': 'Each item needs a headline and a label of Fake or Real'}), 400
+            labeled.append((headline.strip(), FEEDBACK_LABELS[label]))
+
+        batch = []
+        with feedback_lock:
+            pending_feedback.extend(labeled)
+            if len(pending_feedback) >= FEEDBACK_BATCH_SIZE:
+                batch = pending_feedback[:]
+                pending_feedback.clear()
+            pending = len(pending_feedback)
+
+        if batch:
+            detector.partial_fit([h for h, _ in batch], [label for _, label in batch])
+        return jsonify({'accepted': len(labeled), 'applied': len(batch), 'pending': pending})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/reload-model', methods=['POST'])
+def reload_model():
+    """Load the model on disk in the background and swap it in when ready"""
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({'error': 'Forbidden'}), 403
+    started = model_registry.request_reload()
+    return jsonify({'started': started, **model_registry.status()}), 202
+
+@app.route('/model-status')
+def model_status():
+    return jsonify(model_registry.status())
+
+def page_args():
+    """Keyset pagination arguments: (before, limit)"""
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', 50, type=int)
+    return before, limit
+
+@app.route('/history')
+def article_history():
+    """Stored articles, newest first, optionally filtered by source, label or fetch time"""
+    before, limit = page_args()
+    articles, cursor = article_store.history(
+        before=before,
+        limit=limit,
+        source=request.args.get('source'),
+        label=request.args.get('label'),
+        since=request.args.get('since', type=float)
+    )
+    return jsonify({'articles': articles, 'next_before': cursor})
+
+@app.route('/search')
+def search_articles():
+    """Full-text search over stored headlines, newest first"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Please provide a query in q'}), 400
+    before, limit = page_args()
+    articles, cursor = article_store.search(query, before=before, limit=limit)
+    return jsonify({'articles': articles, 'next_before': cursor})
+
+@app.route('/article-body')
+def article_body():
+    """Body-aware score for a stored article; 202 while it is being computed"""
+    if body_scorer is None:
+        return jsonify({'error': 'Body scoring is disabled; set BODY_SCORING=1'}), 404
+    url = request.args.get('url', '')
+    result = body_scorer.latest(url)
+    if result is not None:
+        return jsonify({'url': url, **result})
+    # Only pages the feed has seen are downloaded
+    article = article_store.by_url(url)
+    if article is None:
+        return jsonify({'error': 'Unknown article URL'}), 404
+    future = body_scorer.submit(article)
+    if future.done() and 'error' in future.result():
+        return jsonify(future.result()), 502
+    return jsonify({'url': url, 'status': 'pending'}), 202, {'Retry-After': '1'}
+
 @app.route('/recent-news')
 def get_recent_news():
     """Get recent analyzed news"""
-    return jsonify({'news': recent_news[:10]})
+    snapshot = feed_snapshot.current()
+    if snapshot is None:
+        return jsonify({'news': []})
+    response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.headers['X-Feed-Version'] = str(snapshot.version)
+    # 304 when the client's If-None-Match is still current
+    return response.make_conditional(request)
+
+@app.route('/stream')
+def stream_news():
+    """Server-Sent Events: the current news, then each newly scored article"""
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('last_event_id', type=int)
+    events = news_events.stream(last_id, snapshot=lambda: feed_snapshot.articles() or [])
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/analyze-live')
 def analyze_live_news():
-    """Fetch and analyze live news"""
+    """Return the latest analyzed news, refreshing it in the background when stale"""
     try:
-        articles = news_fetcher.fetch_latest_news()[:5]
-        results = []
-        for article in articles:
-            result = detector.predict(article.get('title', ''))
-            merged = {**article, **result}
-            results.append(merged)
-        return jsonify({'results': results})
+        if feed_snapshot.is_leader:
+            results, age = live_news.get()
+        else:
+            results, age = feed_snapshot.articles(), feed_snapshot.age()
+        if results is None:
+            return jsonify({'error': 'News is not available yet, please retry'}), 503
+        return jsonify({
+            'results': results[:5],
+            'snapshot_age': round(age, 1),
+            'stale': age >= live_news.max_age,
+            'refreshing': live_news.refreshing
+        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
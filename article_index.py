@@ -0,0 +1,57 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class SeenArticleIndex:
+    """Remembers the prediction for each article already scored.
+
+    Articles are keyed on URL plus a hash of the title, so an article whose
+    title is edited is treated as new. Entries are kept in least-recently-seen
+    order and dropped once they exceed max_entries or go unseen for max_age
+    seconds.
+    """
+
+    def __init__(self, max_entries=5000, max_age=24 * 3600):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(article):
+        title = article.get('title', '')
+        title_hash = hashlib.sha1(title.encode('utf-8')).hexdigest()
+        return article.get('url', ''), title_hash
+
+    def get(self, article):
+        """Return the stored prediction for an article, or None if it is new"""
+        key = self.key(article)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = (entry[0], time.monotonic())
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def add(self, article, result):
+        key = self.key(article)
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        cutoff = time.monotonic() - self.max_age
+        while self._entries:
+            key, (_, last_seen) = next(iter(self._entries.items()))
+            if last_seen >= cutoff:
+                break
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
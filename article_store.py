@@ -0,0 +1,210 @@
+"""SQLite store of every fetched article and its prediction.
+
+The database runs in WAL mode, so server workers can read while the feed
+leader writes. Each refresh cycle is written in a single transaction.
+History and search are keyset-paginated on the row id: a page asks for
+rows below the last id it has seen and never scans skipped rows, however
+deep the page.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    source TEXT,
+    sources TEXT,
+    published_at TEXT,
+    fetched_at REAL NOT NULL,
+    prediction TEXT,
+    confidence REAL,
+    is_real INTEGER,
+    model_version TEXT,
+    UNIQUE (url, title_hash)
+);
+CREATE INDEX IF NOT EXISTS articles_source ON articles (source, id);
+CREATE INDEX IF NOT EXISTS articles_prediction ON articles (prediction, id);
+CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles (fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title) VALUES ('delete', old.id, old.title);
+END;
+"""
+
+COLUMNS = ('id', 'url', 'title', 'source', 'sources', 'published_at', 'fetched_at',
+           'prediction', 'confidence', 'is_real', 'model_version')
+
+WORD = re.compile(r'\w+')
+
+
+class ArticleStore:
+    def __init__(self, path='data/news.db'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # sqlite3 connections are not shared between threads
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Safe with WAL: a crash may lose the last cycle, never corrupt
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_many(self, articles):
+        """Record scored articles in one transaction; returns the new ones.
+
+        An article already stored under the same URL and title keeps its
+        row; only its prediction is updated if a different model version
+        scored it. The returned articles are the newly inserted ones,
+        carrying their row ``id``, in insertion order.
+        """
+        now = time.time()
+        rows = []
+        for article in articles:
+            if 'error' in article:
+                continue
+            title = article.get('title') or article.get('headline') or ''
+            sources = article.get('sources')
+            rows.append((
+                article.get('url') or '',
+                hashlib.sha1(title.encode('utf-8')).hexdigest(),
+                title,
+                article.get('source'),
+                json.dumps(sources) if sources else None,
+                article.get('published_at'),
+                now,
+                article.get('prediction'),
+                article.get('confidence'),
+                None if article.get('is_real') is None else int(article['is_real']),
+                article.get('model_version')
+            ))
+        conn = self._connect()
+        with conn:
+            # Taken before reading the last id, so no other writer can
+            # insert rows in between
+            conn.execute("BEGIN IMMEDIATE")
+            last_id = conn.execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO articles (url, title_hash, title, source, sources, published_at,"
+                " fetched_at, prediction, confidence, is_real, model_version)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (url, title_hash) DO UPDATE SET prediction = excluded.prediction,"
+                " confidence = excluded.confidence, is_real = excluded.is_real,"
+                " model_version = excluded.model_version"
+                " WHERE articles.model_version IS NOT excluded.model_version", rows)
+            new_rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM articles WHERE id > ? ORDER BY id",
+                                    (last_id,)).fetchall()
+        return [row_to_article(row) for row in new_rows]
+
+    def history(self, before=None, limit=50, source=None, label=None, since=None):
+        """Newest stored articles first; pass the returned cursor as ``before``"""
+        where, params = [], []
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        if source:
+            where.append("source = ?")
+            params.append(source)
+        if label:
+            where.append("prediction = ?")
+            params.append(label)
+        if since is not None:
+            where.append("fetched_at >= ?")
+            params.append(since)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM articles"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._page(sql + " ORDER BY id DESC LIMIT ?", params, limit)
+
+    def search(self, query, before=None, limit=50):
+        """Articles whose title contains every word of query, newest first.
+
+        The last word also matches as a prefix, so partially typed queries
+        find results.
+        """
+        match = fts_query(query)
+        if match is None:
+            return [], None
+        sql = (f"SELECT {', '.join('a.' + c for c in COLUMNS)} FROM articles_fts"
+               f" JOIN articles a ON a.id = articles_fts.rowid WHERE articles_fts MATCH ?")
+        params = [match]
+        if before is not None:
+            sql += " AND articles_fts.rowid < ?"
+            params.append(before)
+        return self._page(sql + " ORDER BY articles_fts.rowid DESC LIMIT ?", params, limit)
+
+    def _page(self, sql, params, limit):
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        rows = self._connect().execute(sql, params + [limit]).fetchall()
+        articles = [row_to_article(row) for row in rows]
+        # A short page is the last one
+        cursor = articles[-1]['id'] if len(articles) == limit else None
+        return articles, cursor
+
+    def newer_than(self, last_id, limit=MAX_PAGE_SIZE):
+        """Articles stored after ``last_id``, oldest first"""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)).fetchall()
+        return [row_to_article(row) for row in rows]
+
+    def by_url(self, url):
+        """The most recently stored article with this URL, or None"""
+        row = self._connect().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM articles WHERE url = ? ORDER BY id DESC LIMIT 1",
+            (url,)).fetchone()
+        return None if row is None else row_to_article(row)
+
+    def last_id(self):
+        return self._connect().execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0]
+
+    def count(self):
+        return self._connect().execute("SELECT count(*) FROM articles").fetchone()[0]
+
+
+def fts_query(query):
+    """FTS5 expression matching every word of a free-text query"""
+    words = WORD.findall(query or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def row_to_article(row):
+    article = {column: row[column] for column in COLUMNS}
+    article['headline'] = article['title']
+    article['sources'] = json.loads(article['sources']) if article['sources'] else []
+    if article['is_real'] is not None:
+        article['is_real'] = bool(article['is_real'])
+    return article
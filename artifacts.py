@@ -0,0 +1,169 @@
+"""Flat, memory-mappable model artifacts.
+
+``export_artifacts`` writes the vectorizer vocabulary, idf vector and model
+parameters as plain ``.npy`` arrays plus a JSON manifest. ``load_artifacts``
+maps the arrays read-only, so every server worker shares the same pages
+instead of unpickling its own copy. The manifest records the size and
+mtime of the pickles it was exported from, so a newer model.pkl is not
+shadowed by stale arrays.
+
+Convert the pickles produced by train_model.py with:
+    python artifacts.py [models]
+"""
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+from forest_engine import ArrayForest
+
+# 2: leaves are their own children with an infinite threshold
+FORMAT_VERSION = 2
+COMPILED_DIR = 'compiled'
+MANIFEST = 'manifest.json'
+SOURCE_FILES = ('model.pkl', 'vectorizer.pkl')
+
+# TfidfVectorizer parameters that affect transform()
+VECTORIZER_PARAMS = (
+    'lowercase', 'strip_accents', 'token_pattern', 'ngram_range', 'stop_words',
+    'analyzer', 'binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf'
+)
+
+
+def compiled_path(model_dir='models'):
+    return os.path.join(model_dir, COMPILED_DIR)
+
+
+def source_fingerprint(model_dir):
+    """Size and mtime of the pickles in model_dir, or None if one is missing"""
+    fingerprint = {}
+    for name in SOURCE_FILES:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        fingerprint[name] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def export_artifacts(vectorizer, model, directory, source=None):
+    """Write a fitted TfidfVectorizer and model as flat arrays.
+
+    ``source`` is the source_fingerprint of the pickles they came from.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    params = {}
+    for name in VECTORIZER_PARAMS:
+        value = getattr(vectorizer, name)
+        if isinstance(value, (set, frozenset, tuple)):
+            value = sorted(value) if isinstance(value, (set, frozenset)) else list(value)
+        params[name] = value
+
+    # Terms ordered by feature index; preprocessed text never contains newlines
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    with _replace(os.path.join(directory, 'vocabulary.txt')) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(terms))
+    _save_array(os.path.join(directory, 'idf.npy'), np.asarray(vectorizer.idf_, dtype=np.float64))
+
+    if hasattr(model, 'estimators_'):
+        model_type = 'forest'
+        arrays = ArrayForest.from_sklearn(model).arrays()
+    else:
+        model_type = 'linear'
+        arrays = {
+            'coef': np.asarray(model.coef_, dtype=np.float64),
+            'intercept': np.asarray(model.intercept_, dtype=np.float64),
+            'classes': np.asarray(model.classes_)
+        }
+    for name, array in arrays.items():
+        _save_array(os.path.join(directory, f'{name}.npy'), array)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'vectorizer': params,
+        'model_type': model_type,
+        'arrays': sorted(arrays),
+        'source': source
+    }
+    # Written last, so a manifest only exists for a complete export
+    with _replace(os.path.join(directory, MANIFEST)) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+@contextmanager
+def _replace(path):
+    """Yield a temporary path that is renamed over ``path`` on success.
+
+    Running processes may have the old file memory-mapped; renaming gives
+    the new file a fresh inode instead of truncating pages under them.
+    """
+    tmp_path = f"{path}.tmp"
+    yield tmp_path
+    os.replace(tmp_path, path)
+
+
+def _save_array(path, array):
+    with _replace(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+
+
+def has_artifacts(directory):
+    return os.path.exists(os.path.join(directory, MANIFEST))
+
+
+def is_current(directory, model_dir):
+    """Whether the artifacts were exported from the pickles now in model_dir"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        source = json.load(f).get('source')
+    return source is not None and source == source_fingerprint(model_dir)
+
+
+def load_artifacts(directory):
+    """Load (vectorizer, model) from a directory written by export_artifacts"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest['format_version']}; "
+                         f"re-export with `python artifacts.py`")
+
+    params = dict(manifest['vectorizer'])
+    params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(**params)
+    with open(os.path.join(directory, 'vocabulary.txt'), encoding='utf-8') as f:
+        terms = f.read().split('\n')
+    vectorizer.vocabulary_ = {term: index for index, term in enumerate(terms)}
+    vectorizer.idf_ = np.load(os.path.join(directory, 'idf.npy'), mmap_mode='r')
+
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+              for name in manifest['arrays']}
+    if manifest['model_type'] == 'forest':
+        model = ArrayForest(**{name: arrays[name] for name in ArrayForest.ARRAYS})
+    else:
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression()
+        model.coef_ = arrays['coef']
+        model.intercept_ = arrays['intercept']
+        model.classes_ = np.asarray(arrays['classes'])
+    return vectorizer, model
+
+
+if __name__ == '__main__':
+    import pickle
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else 'models'
+    with open(os.path.join(model_dir, 'vectorizer.pkl'), 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(os.path.join(model_dir, 'model.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    export_artifacts(vectorizer, model, compiled_path(model_dir), source=source_fingerprint(model_dir))
+    print(f"Exported artifacts to {compiled_path(model_dir)}")
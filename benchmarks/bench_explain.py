@@ -0,0 +1,68 @@
+"""Benchmark: prediction latency with and without per-term explanations.
+
+Times the detector's full predict path (preprocess, vectorize, score) for
+single headlines and for batches, once plain and once with explain=True.
+The prediction cache is cleared before every call, so both sides do the
+same scoring work. Run from the project root:
+    python benchmarks/bench_explain.py [--model-dir models] [--csv models/True.csv]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_utils import load_headlines, percentiles
+from model import FakeNewsDetector
+
+BATCH_SIZES = (1, 32, 256, 2048)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--csv', help='CSV file with a title column')
+    parser.add_argument('--single', type=int, default=500, help='single-headline predictions to time')
+    parser.add_argument('--top-terms', type=int, default=5)
+    args = parser.parse_args()
+
+    detector = FakeNewsDetector(model_dir=args.model_dir)
+    detector.load()
+    explainer = detector.bundle.explainer
+    print(f"Model: {type(detector.bundle.model).__name__}, "
+          f"explainer: {type(explainer).__name__ if explainer else 'none'}")
+
+    headlines = load_headlines(args.csv, max(BATCH_SIZES))
+    # Warm up preprocessing
+    detector.predict_batch(headlines[:32], explain=True, top_terms=args.top_terms)
+
+    print("\nSingle-headline latency")
+    for explain in (False, True):
+        samples = []
+        for i in range(args.single):
+            detector.cache.clear()
+            start = time.perf_counter()
+            detector.predict(headlines[i % len(headlines)], explain=explain, top_terms=args.top_terms)
+            samples.append(time.perf_counter() - start)
+        print(f"  {'explain' if explain else 'plain':<8} {percentiles(samples)}")
+
+    print("\nBatch throughput (headlines/s)")
+    print(f"  {'rows':>6} {'plain':>12} {'explain':>12} {'overhead':>9}")
+    for size in BATCH_SIZES:
+        batch = headlines[:size]
+        rates = []
+        for explain in (False, True):
+            repeats = max(1, 2048 // size)
+            elapsed = 0.0
+            for _ in range(repeats):
+                detector.cache.clear()
+                start = time.perf_counter()
+                detector.predict_batch(batch, explain=explain, top_terms=args.top_terms)
+                elapsed += time.perf_counter() - start
+            rates.append(size * repeats / elapsed)
+        print(f"  {size:>6} {rates[0]:>12,.0f} {rates[1]:>12,.0f} {rates[0] / rates[1] - 1:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: sklearn RandomForest vs the flat-array ArrayForest engine.
+
+Reports single-row latency percentiles, batch throughput, the largest
+probability difference, and model/prediction memory. "numpy" is the
+array traversal alone, kept as a fallback. "pickle" is the engine as
+served from model.pkl: the forest's own trees walked one after another,
+and the sklearn forest for batches of DELEGATE_MIN_ROWS or more.
+"compiled" is the engine as served from compiled artifacts, with sklearn
+trees rebuilt from the arrays.
+
+The numpy traversal runs until the deepest (row, tree) pair reaches its
+leaf, so it falls behind as trees get deep: on a 100-tree forest fit on
+noisy TF-IDF data (max depth ~900) it took 14 ms for 1 row and 58 ms for
+31 rows, against 12 and 25 ms in sklearn, while the served engine took
+1.4 and 12 ms. Check the max depth printed below. Run from
+the project root:
+    python benchmarks/bench_forest.py [--model-dir models] [--csv models/True.csv]
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_utils import load_headlines, percentiles
+from forest_engine import ArrayForest
+from preprocessing import TextPreprocessor
+
+BATCH_SIZES = (1, 8, 32, 256, 2048)
+
+
+def peak_allocation(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--csv', help='CSV file with a title column')
+    parser.add_argument('--single', type=int, default=500, help='single-row predictions to time')
+    args = parser.parse_args()
+
+    with open(os.path.join(args.model_dir, 'vectorizer.pkl'), 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(os.path.join(args.model_dir, 'model.pkl'), 'rb') as f:
+        forest = pickle.load(f)
+    engine = ArrayForest.from_sklearn(forest, keep_delegate=True)
+    compiled = ArrayForest(**engine.arrays())
+    numpy_only = ArrayForest(**engine.arrays(), trees=False)
+    engines = (('sklearn', forest), ('numpy', numpy_only), ('pickle', engine), ('compiled', compiled))
+    print(f"Trees: {len(forest.estimators_)}, max depth: {max(e.tree_.max_depth for e in forest.estimators_)}")
+
+    headlines = load_headlines(args.csv, max(BATCH_SIZES))
+    X = vectorizer.transform(TextPreprocessor().preprocess_batch(headlines))
+
+    expected = forest.predict_proba(X)
+    for name, model in engines[1:]:
+        diff = np.abs(expected - model.predict_proba(X)).max()
+        print(f"Max probability difference over {X.shape[0]} rows, {name}: {diff:.2e}")
+
+    print("\nSingle-row latency")
+    for name, model in engines:
+        samples = []
+        for i in range(args.single):
+            row = X[i % X.shape[0]]
+            start = time.perf_counter()
+            model.predict_proba(row)
+            samples.append(time.perf_counter() - start)
+        print(f"  {name:<8} {percentiles(samples)}")
+
+    print("\nBatch throughput (rows/s)")
+    print(f"  {'rows':>6}" + ''.join(f"{name:>12}" for name, _ in engines))
+    for size in BATCH_SIZES:
+        batch = X[:size]
+        rates = []
+        for _, model in engines:
+            repeats = max(1, 2048 // size)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                model.predict_proba(batch)
+            rates.append(size * repeats / (time.perf_counter() - start))
+        print(f"  {size:>6}" + ''.join(f"{rate:>12,.0f}" for rate in rates))
+
+    print("\nMemory")
+    print(f"  sklearn forest (pickled):  {len(pickle.dumps(forest)) / 1e6:8.2f} MB")
+    print(f"  ArrayForest arrays:        {engine.nbytes / 1e6:8.2f} MB")
+    for size in (1, 256):
+        batch = X[:size]
+        print(f"  peak allocation, {size:>4} rows: sklearn {peak_allocation(lambda: forest.predict_proba(batch)) / 1e3:9.1f} KB"
+              f"  arrays {peak_allocation(lambda: engine.predict_proba(batch)) / 1e3:9.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Microbenchmark: original NLTK preprocessing vs the shared TextPreprocessor.
+
+The original pipeline tokenizes with nltk.word_tokenize, which needs the
+punkt models (punkt_tab from NLTK 3.9 on). Nothing else in the project
+uses them, so they are downloaded here on first run. Run from the project root:
+    python benchmarks/bench_preprocess.py [--csv models/True.csv] [--n 20000]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+from bench_utils import load_headlines
+from preprocessing import TextPreprocessor, ensure_nltk_data
+
+
+def ensure_punkt():
+    # NLTK 3.9 replaced the pickled punkt models with punkt_tab
+    package = 'punkt_tab' if hasattr(nltk.tokenize, 'PunktTokenizer') else 'punkt'
+    try:
+        nltk.data.find(f'tokenizers/{package}')
+    except LookupError:
+        nltk.download(package)
+
+
+def legacy_preprocess(text, lemmatizer, stop_words):
+    # The pipeline model.py and train_model.py used before preprocessing.py
+    text = str(text).lower()
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    tokens = nltk.word_tokenize(text)
+    tokens = [lemmatizer.lemmatize(word) for word in tokens if word not in stop_words]
+    return ' '.join(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', help='CSV file with a title column')
+    parser.add_argument('--n', type=int, default=20000, help='number of headlines')
+    args = parser.parse_args()
+
+    headlines = load_headlines(args.csv, args.n)
+    ensure_nltk_data()
+    ensure_punkt()
+
+    lemmatizer = WordNetLemmatizer()
+    stop_words = set(stopwords.words('english'))
+    start = time.perf_counter()
+    expected = [legacy_preprocess(h, lemmatizer, stop_words) for h in headlines]
+    legacy_time = time.perf_counter() - start
+
+    preprocessor = TextPreprocessor()
+    start = time.perf_counter()
+    actual = preprocessor.preprocess_batch(headlines)
+    fast_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"Headlines:      {len(headlines)}")
+    print(f"Legacy (NLTK):  {len(headlines) / legacy_time:,.0f} headlines/s")
+    print(f"Preprocessor:   {len(headlines) / fast_time:,.0f} headlines/s")
+    print(f"Speedup:        {legacy_time / fast_time:.1f}x")
+    print(f"Lemma cache:    {preprocessor.cache_info()}")
+    print(f"Mismatches:     {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Startup benchmark: pickled model vs memory-mapped compiled artifacts.
+
+Each measurement runs in a fresh interpreter so imports and loads are cold.
+Export the compiled artifacts first (``python artifacts.py``), then run
+from the project root:
+    python benchmarks/bench_startup.py [--model-dir models] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import model
+imported = time.perf_counter()
+detector = model.FakeNewsDetector(model_dir=sys.argv[1], artifact_format=sys.argv[2])
+detector.load()
+loaded = time.perf_counter()
+detector.predict("Government announces new infrastructure plan")
+predicted = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "load": loaded - imported,
+    "first_prediction": predicted - loaded,
+    "total": predicted - start
+}))
+'''
+
+
+def measure(model_dir, artifact_format='auto'):
+    """Seconds spent on import, load, first prediction and in total, in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, model_dir, artifact_format],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'format':<10}{'import':>10}{'load':>10}{'first':>10}{'total':>10}  (median seconds)")
+    for artifact_format in ('pickle', 'compiled'):
+        runs = [measure(args.model_dir, artifact_format) for _ in range(args.runs)]
+        medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{artifact_format:<10}{medians['import']:>10.3f}{medians['load']:>10.3f}"
+              f"{medians['first_prediction']:>10.3f}{medians['total']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Helpers shared by the benchmark scripts in this directory."""
+import numpy as np
+
+
+def load_headlines(csv_path, n, default=None):
+    """n headlines from the title column of csv_path, else from default or the sample news"""
+    if csv_path:
+        import pandas as pd
+        titles = pd.read_csv(csv_path)['title'].dropna().tolist()
+    elif default:
+        titles = list(default)
+    else:
+        from news_fetcher import NewsFetcher
+        titles = [article['title'] for article in NewsFetcher().sample_news]
+    # Repeat the corpus up to n items, like a feed that keeps re-sending titles
+    return (titles * (n // len(titles) + 1))[:n]
+
+
+def latency_stats(prefix, samples):
+    """p50, p95 and p99 of samples in seconds, as {prefix}_pNN_ms milliseconds"""
+    ms = np.array(samples) * 1000
+    return {f"{prefix}_p{p}_ms": float(np.percentile(ms, p)) for p in (50, 95, 99)}
+
+
+def percentiles(samples):
+    stats = latency_stats('', samples)
+    return '  '.join(f"p{p} {stats[f'_p{p}_ms']:7.3f} ms" for p in (50, 95, 99))
@@ -0,0 +1,370 @@
+"""Benchmark and load-test suite with JSON results and baseline comparison.
+
+Sections (all by default, or pick with --sections):
+    preprocess    headline preprocessing throughput, cold and warm lemma cache
+    predict       single-headline latency percentiles and batch throughput
+    startup       model import, load and first prediction in a fresh interpreter
+    feed_refresh  RSS and NewsAPI fetches against the local stub feeds, cold
+                  and with 304 revalidation, and a full fetch-and-score cycle
+    load          concurrent clients against /predict, /recent-news and
+                  /analyze-live of a server started on the stub feeds
+
+Headlines come from a fixed seed (or --csv), feeds from benchmarks/stub_feeds.py,
+and nothing touches the network. Results are written as JSON; with
+--baseline each metric is compared against an earlier results file and the
+exit status is 1 if any got worse by more than --tolerance. Run from the
+project root:
+    python benchmarks/run_suite.py -o baseline.json
+    python benchmarks/run_suite.py --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import requests
+
+from bench_startup import measure
+from bench_utils import latency_stats, load_headlines
+from stub_feeds import StubFeedServer, headlines
+
+SECTIONS = ('preprocess', 'predict', 'startup', 'feed_refresh', 'load')
+SUITE_VERSION = 1
+# Options that do not change what is measured
+RUN_OPTIONS = {'sections', 'output', 'baseline', 'tolerance'}
+
+SERVER_CHILD = '''
+import logging
+from werkzeug.serving import make_server
+import app
+logging.getLogger("werkzeug").setLevel(logging.WARNING)
+server = make_server("127.0.0.1", 0, app.app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+'''
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_preprocess(args, corpus):
+    from preprocessing import TextPreprocessor
+    preprocessor = TextPreprocessor()
+    cold = timed(lambda: preprocessor.preprocess_batch(corpus))
+    warm = timed(lambda: preprocessor.preprocess_batch(corpus))
+    single = corpus[:args.single]
+    one_by_one = timed(lambda: [preprocessor.preprocess(text) for text in single])
+    return {
+        'batch_cold_per_s': len(corpus) / cold,
+        'batch_warm_per_s': len(corpus) / warm,
+        'single_per_s': len(single) / one_by_one
+    }
+
+
+def bench_predict(args, corpus):
+    from model import FakeNewsDetector
+    detector = FakeNewsDetector(model_dir=args.model_dir)
+    detector.load()
+    detector.predict_batch(corpus[:64])
+
+    results = {}
+    samples = []
+    for i in range(args.single):
+        detector.cache.clear()
+        samples.append(timed(lambda: detector.predict(corpus[i % len(corpus)])))
+    results.update(latency_stats('single', samples))
+
+    # The same headline again is answered from the prediction cache
+    detector.predict(corpus[0])
+    results.update(latency_stats('cached', [timed(lambda: detector.predict(corpus[0]))
+                                            for _ in range(args.single)]))
+
+    for size in (32, 256, 2048):
+        batch = corpus[:size]
+        samples = []
+        for _ in range(max(3, 4096 // size)):
+            detector.cache.clear()
+            samples.append(timed(lambda: detector.predict_batch(batch)))
+        results[f"batch{size}_p50_ms"] = float(np.percentile(samples, 50) * 1000)
+        results[f"batch{size}_per_s"] = size / statistics.median(samples)
+    return results
+
+
+def bench_startup(args):
+    runs = [measure(args.model_dir) for _ in range(args.startup_runs)]
+    return {f"{key}_s": statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def bench_feed_refresh(args, stub):
+    from model import FakeNewsDetector
+    from news_fetcher import NewsFetcher
+
+    def fetcher(newsapi=False):
+        # A generous deadline, so every feed is waited for and timed
+        news = NewsFetcher(refresh_timeout=30)
+        news.rss_feeds = stub.rss_urls
+        if newsapi:
+            news.news_apis['newsapi'].update(url=stub.newsapi_url, key='stub', enabled=True)
+        return news
+
+    # A new fetcher has no validators, so every feed answers 200
+    cold = [timed(fetcher().fetch_latest_news) for _ in range(args.refresh_runs)]
+    warm_fetcher = fetcher()
+    warm_fetcher.fetch_latest_news()
+    warm = [timed(warm_fetcher.fetch_latest_news) for _ in range(args.refresh_runs)]
+    newsapi = [timed(fetcher(newsapi=True).fetch_latest_news) for _ in range(args.refresh_runs)]
+
+    detector = FakeNewsDetector(model_dir=args.model_dir)
+    detector.load()
+
+    def refresh():
+        detector.cache.clear()
+        articles = fetcher().fetch_latest_news()
+        detector.predict_batch([article['title'] for article in articles])
+
+    scored = [timed(refresh) for _ in range(args.refresh_runs)]
+    return {
+        'rss_cold_ms': statistics.median(cold) * 1000,
+        'rss_not_modified_ms': statistics.median(warm) * 1000,
+        'newsapi_ms': statistics.median(newsapi) * 1000,
+        'fetch_and_score_ms': statistics.median(scored) * 1000
+    }
+
+
+def start_server(stub, workdir, model_dir):
+    """Run app.py on the stub feeds in a child process; returns (process, base URL)"""
+    env = dict(os.environ,
+               NEWS_RSS_FEEDS=','.join(stub.rss_urls),
+               ARTICLE_DB=os.path.join(workdir, 'news.db'),
+               MODEL_DIR=model_dir,
+               MODEL_POLL_INTERVAL='0')
+    env.pop('FEED_SNAPSHOT_PATH', None)
+    process = subprocess.Popen([sys.executable, '-c', SERVER_CHILD], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    port = process.stdout.readline().strip()
+    if not port:
+        process.kill()
+        raise RuntimeError('Server did not start')
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_until_ready(base_url, timeout=120):
+    # /analyze-live answers 503 until the first feed refresh is done
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + '/analyze-live', timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} was not ready after {timeout}s")
+
+
+def generate_load(base_url, endpoint, corpus, concurrency, duration):
+    """Closed-loop clients hitting one endpoint for ``duration`` seconds"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        own, failed, i = [], 0, offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                if endpoint == '/predict':
+                    response = session.post(base_url + endpoint, json={'headline': corpus[i % len(corpus)]},
+                                            timeout=30)
+                else:
+                    response = session.get(base_url + endpoint, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            own.append(time.perf_counter() - start)
+            failed += not ok
+            i += concurrency
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    name = endpoint.strip('/').replace('-', '_')
+    return {
+        f"{name}_req_per_s": len(latencies) / elapsed,
+        **latency_stats(name, latencies),
+        f"{name}_error_rate": errors[0] / max(1, len(latencies))
+    }
+
+
+def bench_load(args, corpus, stub):
+    process = None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                process, base_url = start_server(stub, workdir, args.model_dir)
+            wait_until_ready(base_url)
+            results = {}
+            for endpoint in ('/predict', '/recent-news', '/analyze-live'):
+                results.update(generate_load(base_url, endpoint, corpus, args.concurrency, args.duration))
+            return results
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+def environment():
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'git_commit': commit
+    }
+
+
+def metric_direction(name):
+    """1 if a higher value is better, -1 if lower is better, None to skip"""
+    if name.endswith('_per_s'):
+        return 1
+    if name.endswith(('_ms', '_s', '_error_rate')):
+        return -1
+    return None
+
+
+def compare(results, baseline, tolerance):
+    """Rows of (section, metric, baseline, current, change, regressed)"""
+    rows = []
+    for section, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(section, {}).get(name)
+            direction = metric_direction(name)
+            if old is None or direction is None:
+                continue
+            if old == 0:
+                change = 0.0 if value == 0 else float('inf')
+            else:
+                change = (value - old) / old
+            # Positive when the metric got worse
+            worse = change if direction < 0 else -change
+            rows.append((section, name, old, value, change, worse > tolerance))
+    return rows
+
+
+def print_section(section, metrics):
+    print(f"\n{section}")
+    for name, value in metrics.items():
+        print(f"  {name:<32}{value:>14,.3f}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%})")
+    print(f"  {'metric':<45}{'baseline':>12}{'current':>12}{'change':>9}")
+    for section, name, old, value, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"  {section + '.' + name:<45}{old:>12,.3f}{value:>12,.3f}{change:>+9.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', default=','.join(SECTIONS),
+                        help=f"comma-separated subset of {', '.join(SECTIONS)}")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--csv', help='CSV file with a title column (default: seeded synthetic headlines)')
+    parser.add_argument('--headlines', type=int, default=5000, help='corpus size')
+    parser.add_argument('--single', type=int, default=500, help='single-headline calls to time')
+    parser.add_argument('--startup-runs', type=int, default=3)
+    parser.add_argument('--refresh-runs', type=int, default=5)
+    parser.add_argument('--feeds', type=int, default=8, help='stub RSS feeds')
+    parser.add_argument('--feed-latency', type=float, default=0.02, help='seconds added to every stub response')
+    parser.add_argument('--url', help='load-test this running server instead of starting one')
+    parser.add_argument('--concurrency', type=int, default=16, help='load-test clients per endpoint')
+    parser.add_argument('--duration', type=float, default=10, help='load-test seconds per endpoint')
+    parser.add_argument('-o', '--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='relative change counted as a regression (default 0.15)')
+    args = parser.parse_args()
+
+    sections = [name.strip() for name in args.sections.split(',') if name.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    corpus = load_headlines(args.csv, args.headlines, default=headlines('corpus', args.headlines))
+    results = {}
+    with StubFeedServer(feeds=args.feeds, latency=args.feed_latency) as stub:
+        for section in sections:
+            if section == 'preprocess':
+                results[section] = bench_preprocess(args, corpus)
+            elif section == 'predict':
+                results[section] = bench_predict(args, corpus)
+            elif section == 'startup':
+                results[section] = bench_startup(args)
+            elif section == 'feed_refresh':
+                results[section] = bench_feed_refresh(args, stub)
+            elif section == 'load':
+                results[section] = bench_load(args, corpus, stub)
+            print_section(section, results[section])
+
+    report = {
+        'suite_version': SUITE_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': vars(args),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('platform') != report['environment']['platform']:
+            print("Warning: the baseline was recorded on a different platform")
+        changed = sorted(key for key, value in report['config'].items()
+                         if key not in RUN_OPTIONS and baseline.get('config', {}).get(key) != value)
+        if changed:
+            print(f"Warning: the baseline used different settings for {', '.join(changed)}")
+        rows = compare(results, baseline.get('results', {}), args.tolerance)
+        print_comparison(rows, args.tolerance)
+        regressions = sum(1 for row in rows if row[-1])
+        print(f"\n{regressions} regression(s)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
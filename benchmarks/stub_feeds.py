@@ -0,0 +1,163 @@
+"""Local stand-in for the RSS feeds and NewsAPI, for benchmarks and load tests.
+
+Every feed is generated from a fixed seed, so runs see the same headlines.
+Feeds send an ETag and answer a matching If-None-Match with 304, like the
+real ones. ``latency`` adds a delay to every response. Routes:
+    /rss/<n>.xml              RSS feed number n
+    /v2/top-headlines         NewsAPI-shaped JSON
+
+Run on its own to point a development server at it:
+    python benchmarks/stub_feeds.py --port 8001 --feeds 4
+    NEWS_RSS_FEEDS=http://127.0.0.1:8001/rss/0.xml,http://127.0.0.1:8001/rss/1.xml python app.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+SUBJECTS = ('Government', 'Scientists', 'Local council', 'Senate', 'Health officials', 'Researchers',
+            'Celebrity', 'Tech company', 'Central bank', 'Police', 'Aliens', 'Doctors')
+VERBS = ('announce', 'reveal', 'deny', 'approve', 'discover', 'warn about', 'hide', 'launch',
+         'confirm', 'investigate')
+OBJECTS = ('new infrastructure plan', 'miracle cure', 'budget deal', 'climate report', 'secret base',
+           'vaccine trial results', 'election results', 'interest rate change', 'school funding',
+           'shocking truth about water', 'trade agreement', 'data breach')
+TAILS = ('', ' amid protests', ' after long review', ' in surprise move', ', sources say',
+         ' that experts call a hoax', ' ahead of summit')
+
+NEWSAPI_PATH = '/v2/top-headlines'
+
+
+def headlines(seed, n):
+    """n deterministic headlines for one seed"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(TAILS)}"
+            for _ in range(n)]
+
+
+def rss_feed(n, items):
+    entries = []
+    for i, title in enumerate(headlines(n, items)):
+        published = formatdate(1700000000 + n * 3600 + i * 60, usegmt=True)
+        entries.append(f"<item><title>{escape(title)}</title><link>https://stub.example/{n}/{i}</link>"
+                       f"<pubDate>{published}</pubDate></item>")
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Stub feed {n}</title>'
+            f"{''.join(entries)}</channel></rss>").encode('utf-8')
+
+
+def newsapi_response(items):
+    articles = [{
+        'title': title,
+        'url': f"https://stub.example/api/{i}",
+        'source': {'name': 'Stub API'},
+        'publishedAt': f"2023-11-14T{i % 24:02d}:00:00Z"
+    } for i, title in enumerate(headlines('newsapi', items))]
+    return json.dumps({'status': 'ok', 'totalResults': len(articles), 'articles': articles}).encode('utf-8')
+
+
+class StubFeedServer:
+    """Serve stub feeds from a background thread; port 0 picks a free port"""
+
+    def __init__(self, host='127.0.0.1', port=0, feeds=4, items=20, latency=0.0):
+        self.feeds = feeds
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self._bodies = {f"/rss/{n}.xml": (rss_feed(n, items), 'application/rss+xml') for n in range(feeds)}
+        self._bodies[NEWSAPI_PATH] = (newsapi_response(items), 'application/json')
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def rss_urls(self):
+        return [f"{self.base_url}/rss/{n}.xml" for n in range(self.feeds)]
+
+    @property
+    def newsapi_url(self):
+        return self.base_url + NEWSAPI_PATH
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                entry = stub._bodies.get(self.path.split('?')[0])
+                if entry is None:
+                    self.send_error(404)
+                    return
+                body, content_type = entry
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if self.headers.get('If-None-Match') == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='stub-feeds', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--feeds', type=int, default=4)
+    parser.add_argument('--items', type=int, default=20, help='headlines per feed')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    args = parser.parse_args()
+
+    stub = StubFeedServer(args.host, args.port, args.feeds, args.items, args.latency)
+    print(f"NEWS_RSS_FEEDS={','.join(stub.rss_urls)}")
+    print(f"NEWSAPI_URL={stub.newsapi_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Score full article bodies alongside their headlines.
+
+Pages are downloaded as a stream with a byte cap, a connect/read timeout
+and an overall deadline. They are parsed incrementally, so a huge page
+never sits in memory. Only paragraph text is kept, up to
+``chunk_words * max_chunks`` words. The words are split into chunks that
+are scored in one batch together with the headline, and the body and
+headline probabilities are blended into a combined verdict.
+
+Results are cached by URL, a hash of the extracted text and the model
+version, and pages are re-requested with their ETag / Last-Modified validators, so an
+unchanged article is neither parsed nor scored twice. Work runs on a
+small thread pool; callers get a Future and never wait on a download.
+"""
+import codecs
+import hashlib
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+
+import metrics
+from prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+BODY_SECONDS = metrics.histogram('fakenews_body_score_seconds', 'Time to download and score one article body')
+BODIES = metrics.counter('fakenews_body_scores_total', 'Article body scoring by outcome', ('status',))
+
+# Text inside these tags is never article prose
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg'}
+DOWNLOAD_BLOCK = 16384
+TRAILING_WORD = re.compile(r'\S+$')
+# Longer runs without whitespace are not held back waiting for their end
+MAX_WORD_CHARS = 256
+
+
+class ParagraphExtractor(HTMLParser):
+    """Collect the words of <p> elements as HTML is fed in, up to max_words"""
+
+    def __init__(self, max_words, plain_text=False):
+        super().__init__(convert_charrefs=True)
+        self.max_words = max_words
+        # Plain-text responses count every word as prose
+        self.plain_text = plain_text
+        self.words = []
+        # Plain text may split a word across two feeds
+        self._partial = ''
+        self._paragraph = 0
+        self._skip = 0
+
+    @property
+    def full(self):
+        return len(self.words) >= self.max_words
+
+    def feed(self, data):
+        if not self.plain_text:
+            # With convert_charrefs, text is only handed over once a tag
+            # or close() ends it, so words arrive whole
+            super().feed(data)
+            return
+        data = self._partial + data
+        self._partial = ''
+        tail = TRAILING_WORD.search(data)
+        if tail and len(tail.group()) < MAX_WORD_CHARS:
+            data, self._partial = data[:tail.start()], tail.group()
+        self.handle_text(data)
+
+    def close(self):
+        if self.plain_text:
+            self.handle_text(self._partial)
+            self._partial = ''
+        else:
+            super().close()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == 'p':
+            self._paragraph = 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == 'p':
+            self._paragraph = 0
+
+    def handle_data(self, data):
+        if self._paragraph and not self._skip:
+            self.handle_text(data)
+
+    def handle_text(self, data):
+        room = self.max_words - len(self.words)
+        if room > 0:
+            self.words.extend(data.split()[:room])
+
+
+class BodyScorer:
+    def __init__(self, detector, session=None, max_bytes=2_000_000, timeout=(3, 5), deadline=15,
+                 chunk_words=200, max_chunks=20, headline_weight=0.5, cache_size=5000, workers=4):
+        self.detector = detector
+        self.session = session or requests.Session()
+        self.max_bytes = max_bytes
+        # (connect, read) timeout per socket operation, and a cap on the
+        # whole download however slowly the server trickles bytes
+        self.timeout = timeout
+        self.deadline = deadline
+        self.chunk_words = chunk_words
+        self.max_chunks = max_chunks
+        self.headline_weight = headline_weight
+        # (url, text hash, model version) -> result, and url -> validators
+        # and text hash
+        self.results = PredictionCache(max_size=cache_size)
+        self.pages = PredictionCache(max_size=cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='body-score')
+        self._inflight = {}
+        # Re-entrant: a future that is already done runs its callback,
+        # which takes the lock, inside submit()
+        self._lock = threading.RLock()
+
+    def submit(self, article):
+        """Score an article's body in the background; returns a Future.
+
+        Requests for a URL that is already being scored share its Future.
+        """
+        url = article.get('url')
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is None:
+                future = self._inflight[url] = self._executor.submit(self.score, article)
+                future.add_done_callback(lambda _: self._forget(url))
+        return future
+
+    def _forget(self, url):
+        with self._lock:
+            self._inflight.pop(url, None)
+
+    def pending(self, url):
+        return url in self._inflight
+
+    def latest(self, url):
+        """The last result computed for a URL, without downloading anything"""
+        page = self.pages.get(url)
+        if page is None or not page.get('text_hash'):
+            return None
+        return self.results.get((url, page['text_hash'], self.detector.bundle.version))
+
+    def score(self, article):
+        """Download, extract and score one article; blocks the calling thread"""
+        url = article.get('url')
+        headline = article.get('title') or article.get('headline') or ''
+        if not url or not url.startswith(('http://', 'https://')):
+            return {'url': url, 'error': 'Article has no http(s) URL'}
+        with BODY_SECONDS.time():
+            try:
+                version = self.detector.bundle.version
+                page = self.pages.get(url)
+                if page and self.results.get((url, page.get('text_hash'), version)) is None:
+                    # Only scored by an earlier model, or evicted: fetch
+                    # the text in full to score it again
+                    page = None
+                fetched = self._download(url, page)
+                if fetched is None:
+                    # 304 Not Modified: the text, and so the result, is unchanged
+                    BODIES.inc(status='not_modified')
+                    key = (url, page['text_hash'], version)
+                else:
+                    words, truncated, validators = fetched
+                    text = ' '.join(words)
+                    text_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+                    self.pages.put(url, {**validators, 'text_hash': text_hash})
+                    key = (url, text_hash, version)
+                    if self.results.get(key) is None:
+                        self.results.put(key, self._score_text(headline, words, truncated, text_hash))
+                        BODIES.inc(status='scored')
+                    else:
+                        BODIES.inc(status='cached')
+                result = self.results.get(key)
+                if result is None:
+                    # Evicted between calls; score again next time
+                    self.pages.put(url, {})
+                    return {'url': url, 'error': 'Result expired, please retry'}
+                return {'url': url, **result}
+            except Exception as e:
+                BODIES.inc(status='error')
+                logger.warning(f"Could not score body of {url}: {e}")
+                return {'url': url, 'error': str(e)}
+
+    def _download(self, url, page):
+        """Stream a page into a ParagraphExtractor.
+
+        Returns (words, truncated, validators), or None on 304 Not Modified.
+        """
+        headers = {}
+        if page and page.get('text_hash'):
+            if page.get('etag'):
+                headers['If-None-Match'] = page['etag']
+            if page.get('last_modified'):
+                headers['If-Modified-Since'] = page['last_modified']
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and headers:
+                return None
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            extractor = ParagraphExtractor(self.chunk_words * self.max_chunks,
+                                           plain_text=content_type.startswith('text/plain'))
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            received, truncated = 0, False
+            started = time.monotonic()
+            for block in download_blocks(response):
+                received += len(block)
+                extractor.feed(decoder.decode(block))
+                if extractor.full or received >= self.max_bytes:
+                    truncated = True
+                    break
+                if time.monotonic() - started > self.deadline:
+                    truncated = True
+                    logger.info(f"{url} hit the {self.deadline}s download deadline")
+                    break
+            else:
+                extractor.feed(decoder.decode(b'', final=True))
+            extractor.close()
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        return extractor.words, truncated, validators
+
+    def _score_text(self, headline, words, truncated, text_hash):
+        chunks = [' '.join(words[i:i + self.chunk_words])
+                  for i in range(0, len(words), self.chunk_words)]
+        # Headline and every chunk in one batch, kept out of the headline
+        # cache so body chunks do not evict the headlines it is for
+        results = self.detector.predict_batch([headline] + chunks, use_cache=False)
+        head, bodies = results[0], [r for r in results[1:] if 'error' not in r]
+        if 'error' in head:
+            raise RuntimeError(head['error'])
+
+        head_real = probability_real(head)
+        if bodies:
+            body_real = sum(probability_real(r) for r in bodies) / len(bodies)
+            combined_real = self.headline_weight * head_real + (1 - self.headline_weight) * body_real
+        else:
+            # Nothing extracted: fall back to the headline alone
+            body_real, combined_real = None, head_real
+        return {
+            'headline': verdict(head_real),
+            'body': None if body_real is None else {
+                **verdict(body_real),
+                'chunks': len(bodies),
+                'words': len(words),
+                'truncated': truncated
+            },
+            'combined': verdict(combined_real),
+            'content_hash': text_hash,
+            'model_version': head.get('model_version')
+        }
+
+    def stats(self):
+        return {'pending': len(self._inflight), 'cached': len(self.results)}
+
+
+def download_blocks(response):
+    """Yield the body of a streamed response as it arrives"""
+    raw = response.raw
+    if hasattr(raw, 'read1'):
+        # urllib3 2: return whatever has arrived instead of waiting for a
+        # full block, so the deadline is checked while a server trickles
+        while True:
+            block = raw.read1(DOWNLOAD_BLOCK, decode_content=True)
+            if not block:
+                return
+            yield block
+    else:
+        yield from response.iter_content(DOWNLOAD_BLOCK)
+
+
+def probability_real(result):
+    confidence = result['confidence'] / 100
+    return confidence if result['is_real'] else 1 - confidence
+
+
+def verdict(p_real):
+    is_real = bool(p_real >= 0.5)
+    return {
+        'prediction': 'Real' if is_real else 'Fake',
+        'confidence': round(float(max(p_real, 1 - p_real)) * 100, 2),
+        'is_real': is_real
+    }
@@ -0,0 +1,93 @@
+"""Server-Sent Events broadcast of newly scored articles.
+
+Published articles go into a bounded ring buffer, keyed by their article
+store id, and every connected client is woken to send them. A client that
+reconnects with ``Last-Event-ID`` is replayed what it missed from the
+buffer. If that id has already fallen out of the buffer, the client gets
+a ``reset`` event and should reload the full list instead.
+"""
+import json
+import threading
+from collections import deque
+
+# Seconds between comment lines that keep idle connections open
+KEEPALIVE_SECONDS = 15
+
+
+def format_event(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventBroadcaster:
+    def __init__(self, max_events=1000, start_id=0):
+        self.max_events = max_events
+        # (id, serialized event), oldest first; ids increase
+        self._events = deque()
+        # Events up to this id are not in the buffer: published before
+        # start-up or evicted since
+        self._floor = start_id
+        self._condition = threading.Condition()
+        self.last_id = start_id
+        self.subscribers = 0
+        self.published = 0
+
+    def publish(self, articles):
+        """Buffer articles that carry an ``id`` and wake every subscriber"""
+        events = [(article['id'], format_event(article, 'article', article['id']))
+                  for article in articles if article['id'] > self.last_id]
+        if not events:
+            return
+        with self._condition:
+            self._events.extend(events)
+            while len(self._events) > self.max_events:
+                self._floor = self._events.popleft()[0]
+            self.last_id = events[-1][0]
+            self.published += len(events)
+            self._condition.notify_all()
+
+    def since(self, last_id):
+        """(buffered events after last_id, id of the last of them), or None
+        if some were dropped. Without new events the id is last_id."""
+        with self._condition:
+            if last_id < self._floor:
+                return None
+            events = [(event_id, event) for event_id, event in self._events if event_id > last_id]
+        return [event for _, event in events], events[-1][0] if events else last_id
+
+    def stream(self, last_id=None, snapshot=None):
+        """Yield SSE text for one client until it disconnects.
+
+        Without a last_id the client first gets a ``snapshot`` event built
+        by the snapshot callback, and then only new articles.
+        """
+        with self._condition:
+            self.subscribers += 1
+        try:
+            if last_id is None or self.since(last_id) is None:
+                cursor = self.last_id
+                yield format_event(snapshot() if snapshot else [],
+                                   'snapshot' if last_id is None else 'reset', cursor)
+            else:
+                cursor = last_id
+            while True:
+                with self._condition:
+                    if self.last_id <= cursor:
+                        self._condition.wait(KEEPALIVE_SECONDS)
+                batch = self.since(cursor)
+                if batch is None:
+                    # Fell behind the buffer while writing to a slow client
+                    cursor = self.last_id
+                    yield format_event(snapshot() if snapshot else [], 'reset', cursor)
+                    continue
+                # The cursor only moves past events actually sent
+                events, cursor = batch
+                yield ''.join(events) if events else ': keep-alive\n\n'
+        finally:
+            with self._condition:
+                self.subscribers -= 1
@@ -0,0 +1,155 @@
+"""Per-term explanations from tables precomputed when a model is loaded.
+
+Each explanation lists the terms that pushed a headline's score the most,
+with a signed weight: positive pushes towards Real, negative towards Fake.
+
+- Linear models (LogisticRegression, the online SGD model): the weight of
+  a term is its coefficient times its value in the headline.
+- Random forests: tree-path contributions. Every split moves the
+  probability of Real from a node to its child; that change is credited
+  to the split's feature and averaged over trees. The per-node changes
+  and parent links are computed once at load time, so an explanation is
+  one leaf lookup plus a walk back up to the roots.
+
+Forests also credit terms a headline does *not* contain (an absent word
+can be strong evidence), so each entry says whether the term is present.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from forest_engine import ArrayForest
+
+# The detector reports label 1 as Real
+REAL = 1
+
+
+def build_explainer(vectorizer, model):
+    """Explainer for a vectorizer/model pair, or None if the model is not supported"""
+    if isinstance(model, ArrayForest):
+        return ForestExplainer(vectorizer, model)
+    if hasattr(model, 'estimators_'):
+        return ForestExplainer(vectorizer, ArrayForest.from_sklearn(model, keep_delegate=True))
+    if hasattr(model, 'coef_'):
+        return LinearExplainer(vectorizer, model)
+    return None
+
+
+class TermNames:
+    """Map feature columns back to terms"""
+
+    def __init__(self, vectorizer):
+        self.vectorizer = vectorizer
+        vocabulary = getattr(vectorizer, 'vocabulary_', None)
+        if vocabulary is not None:
+            self.terms = [None] * len(vocabulary)
+            for term, index in vocabulary.items():
+                self.terms[index] = term
+        else:
+            # Hashed features: recover terms from the headline itself
+            self.terms = None
+            self.analyzer = vectorizer.build_analyzer()
+
+    def for_text(self, text):
+        """Lookup from column to term for one preprocessed headline"""
+        if self.terms is not None:
+            return self.terms
+        from sklearn.utils import murmurhash3_32
+        n_features = self.vectorizer.n_features
+        return {abs(murmurhash3_32(term, seed=0)) % n_features: term for term in self.analyzer(text)}
+
+
+class LinearExplainer:
+    def __init__(self, vectorizer, model):
+        self.names = TermNames(vectorizer)
+        # Binary models keep one coefficient row, pointing to classes_[1]
+        sign = 1.0 if model.classes_[1] == REAL else -1.0
+        self.weights = sign * np.asarray(model.coef_[0], dtype=np.float64)
+        self.model = model
+
+    def predict_proba_explain(self, X, texts, top_k):
+        """Class probabilities and explanations for the rows of X"""
+        return self.model.predict_proba(X), self.explain(X, texts, top_k)
+
+    def explain(self, X, texts, top_k):
+        X = sp.csr_matrix(X)
+        explanations = []
+        for row, text in enumerate(texts):
+            start, end = X.indptr[row], X.indptr[row + 1]
+            features = X.indices[start:end]
+            contributions = X.data[start:end] * self.weights[features]
+            explanations.append(_top_terms(features, contributions, set(features), self.names.for_text(text), top_k))
+        return explanations
+
+
+class ForestExplainer:
+    def __init__(self, vectorizer, forest):
+        self.names = TermNames(vectorizer)
+        self.forest = forest
+        left = np.asarray(forest.children_left)
+        right = np.asarray(forest.children_right)
+        nodes = np.arange(len(left))
+        internal = nodes[left != nodes]
+        # Parent of every node; -1 for roots
+        self.parent = np.full(len(left), -1, dtype=np.int64)
+        self.parent[left[internal]] = internal
+        self.parent[right[internal]] = internal
+        has_parent = self.parent >= 0
+        real = list(forest.classes_).index(REAL)
+        p_real = np.asarray(forest.value)[:, real]
+        # Change in P(Real) from the parent to this node, and the feature
+        # the parent split on
+        self.delta = np.zeros(len(left))
+        self.delta[has_parent] = p_real[has_parent] - p_real[self.parent[has_parent]]
+        self.split_feature = np.zeros(len(left), dtype=np.int64)
+        self.split_feature[has_parent] = np.asarray(forest.feature)[self.parent[has_parent]]
+
+    def predict_proba_explain(self, X, texts, top_k):
+        """Class probabilities and explanations from a single pass over the trees"""
+        leaves = self.forest.apply(X)
+        return self.forest.value[leaves].mean(axis=1), self.explain(X, texts, top_k, leaves)
+
+    def explain(self, X, texts, top_k, leaves=None):
+        X = sp.csr_matrix(X)
+        n_rows, n_features = X.shape
+        if leaves is None:
+            leaves = self.forest.apply(X)
+        n_trees = leaves.shape[1]
+
+        # Walk every (row, tree) path from leaf to root at once, keyed by
+        # row * n_features + feature
+        nodes = leaves.ravel()
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), n_trees)
+        keys, values = [], []
+        while nodes.size:
+            keep = self.parent[nodes] >= 0
+            nodes, rows = nodes[keep], rows[keep]
+            keys.append(rows * n_features + self.split_feature[nodes])
+            values.append(self.delta[nodes])
+            nodes = self.parent[nodes]
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(values)) / n_trees
+
+        explanations = []
+        bounds = np.searchsorted(keys, np.arange(n_rows + 1) * n_features)
+        for row, text in enumerate(texts):
+            start, end = bounds[row], bounds[row + 1]
+            present = set(X.indices[X.indptr[row]:X.indptr[row + 1]])
+            explanations.append(_top_terms(keys[start:end] - row * n_features, totals[start:end],
+                                           present, self.names.for_text(text), top_k))
+        return explanations
+
+
+def _top_terms(features, contributions, present, names, top_k):
+    order = np.argsort(-np.abs(contributions), kind='stable')[:top_k]
+    terms = []
+    for i in order:
+        if contributions[i] == 0:
+            break
+        feature = int(features[i])
+        term = names[feature] if isinstance(names, list) else names.get(feature)
+        terms.append({
+            'term': term if term is not None else f'#{feature}',
+            'weight': round(float(contributions[i]), 4),
+            'present': feature in present
+        })
+    return terms
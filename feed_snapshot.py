@@ -0,0 +1,128 @@
+"""Scored news feed shared by every server worker.
+
+One process, the leader, fetches and scores the feed and calls
+``publish``; the articles are serialized to JSON once and written to a
+snapshot file. Every worker memory-maps the file when its version changes
+and serves the same pre-serialized bytes, with an ETag, until the next
+version appears.
+
+Leadership is an exclusive ``flock`` on ``<path>.lock``. The kernel
+releases it when the leader exits, so another worker can take over.
+Without a path (or on platforms without ``fcntl``) the snapshot lives in
+memory and the process is always the leader.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process leader election
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FNS1'
+# magic, version, published (unix time), body length
+HEADER = struct.Struct('<4sQdQ')
+
+Snapshot = namedtuple('Snapshot', 'version published etag body')
+
+
+class FeedSnapshot:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock_file = None
+        self._snapshot = None
+        # (inode, mtime, size) of the file _snapshot was read from
+        self._file_key = None
+        self._articles = None
+        self._articles_version = None
+        self.is_leader = path is None or fcntl is None
+        if not self.is_leader:
+            self.try_lead()
+
+    def try_lead(self):
+        """Become the leader if no other process is; True if we are it"""
+        if self.is_leader:
+            return True
+        lock_file = open(f"{self.path}.lock", 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held for the life of the process
+        self._lock_file = lock_file
+        self.is_leader = True
+        logger.info(f"Process {os.getpid()} is now the news feed leader")
+        return True
+
+    def publish(self, articles):
+        """Serialize articles once and make them the current snapshot"""
+        current = self.current()
+        version = current.version + 1 if current else 1
+        body = json.dumps({'news': articles}, separators=(',', ':')).encode('utf-8')
+        snapshot = Snapshot(version, time.time(), self._etag(body), body)
+        if self.path is not None:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, version, snapshot.published, len(body)))
+                f.write(body)
+            # Readers holding the old file keep a consistent copy
+            os.replace(tmp_path, self.path)
+            self._file_key = self._stat()
+        self._snapshot = snapshot
+        return snapshot
+
+    def current(self):
+        """The latest published Snapshot, or None if there is none yet"""
+        if self.path is None:
+            return self._snapshot
+        key = self._stat()
+        if key is not None and key != self._file_key:
+            try:
+                self._snapshot = self._read()
+                self._file_key = key
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read feed snapshot {self.path}: {e}")
+        return self._snapshot
+
+    def articles(self):
+        """The current snapshot's articles, decoded once per version"""
+        snapshot = self.current()
+        if snapshot is None:
+            return None
+        if self._articles_version != snapshot.version:
+            self._articles = json.loads(snapshot.body)['news']
+            self._articles_version = snapshot.version
+        return self._articles
+
+    def age(self):
+        snapshot = self.current()
+        return None if snapshot is None else max(0.0, time.time() - snapshot.published)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _read(self):
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, published, length = HEADER.unpack_from(mm)
+            if magic != MAGIC or HEADER.size + length != len(mm):
+                raise ValueError("corrupt or incomplete snapshot")
+            # WSGI servers need bytes, so each worker copies a version once
+            body = mm[HEADER.size:]
+        return Snapshot(version, published, self._etag(body), body)
+
+    @staticmethod
+    def _etag(body):
+        return hashlib.sha1(body).hexdigest()[:20]
@@ -0,0 +1,246 @@
+import logging
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+# Marker sklearn uses for the children of a leaf node
+LEAF = -1
+
+# Rows scored per traversal pass; bounds the dense lookup table
+CHUNK_ROWS = 1024
+
+# Traversal steps taken between removing finished (row, tree) pairs
+STEPS_PER_SWEEP = 8
+
+# Batches at least this large go to the sklearn forest when one is loaded,
+# which spreads its trees over n_jobs threads. Smaller batches walk the same
+# Cython trees one after another and skip the thread pool start-up; see
+# benchmarks/bench_forest.py
+DELEGATE_MIN_ROWS = 32
+
+
+class ArrayForest:
+    """RandomForest inference over flat node arrays.
+
+    All trees are concatenated into one set of arrays, with child indices
+    rewritten to global node ids and ``roots`` holding the id of each tree's
+    root. Leaves are their own children with an infinite threshold, so a
+    finished traversal simply stays put. Node values are stored as class
+    probabilities. The arrays can be memory-mapped, so several processes
+    share one copy.
+
+    Rows are routed through ``trees``, sklearn's Cython traversal, whose
+    cost follows the path each row takes rather than the deepest path in
+    the batch. With a pickled forest these are its own trees; with
+    memory-mapped arrays they are rebuilt on the first prediction (a
+    private copy of the node arrays). Large batches go to ``delegate``, the
+    sklearn forest, when there is one. The numpy traversal over the arrays
+    is only used when the trees cannot be rebuilt.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots', 'classes')
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, classes,
+                 delegate=None, trees=None):
+        # Plain views of memory-mapped arrays: indexing an np.memmap wraps
+        # every result in a new memmap, which dominates small batches
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.children_left = np.asarray(children_left)
+        self.children_right = np.asarray(children_right)
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots)
+        self.classes_ = np.asarray(classes)
+        # sklearn forest used for large batches, or None
+        self.delegate = delegate
+        # CompiledTrees; None rebuilds them from the arrays on first use,
+        # False keeps every batch on the numpy traversal
+        self.trees = trees
+        self._trees_lock = threading.Lock()
+
+    @classmethod
+    def from_sklearn(cls, forest, keep_delegate=False):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            ids = np.arange(offset, offset + tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left == LEAF
+            roots.append(offset)
+            lefts.append(np.where(is_leaf, ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, ids, tree.children_right + offset).astype(np.int32))
+            # Leaves have a negative feature id; point them at feature 0 so
+            # they can be gathered without masking
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(value / np.where(totals == 0, 1, totals))
+            offset += tree.node_count
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(values),
+            np.array(roots, dtype=np.int32),
+            np.asarray(forest.classes_),
+            delegate=forest if keep_delegate else None,
+            trees=CompiledTrees.from_sklearn(forest) if keep_delegate else None
+        )
+
+    def arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children_left': self.children_left,
+            'children_right': self.children_right,
+            'value': self.value,
+            'roots': self.roots,
+            'classes': self.classes_
+        }
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def is_leaf(self, nodes):
+        return self.children_left[nodes] == nodes
+
+    def compiled_trees(self):
+        if self.trees is None:
+            with self._trees_lock:
+                if self.trees is None:
+                    try:
+                        self.trees = CompiledTrees.from_arrays(self)
+                    except Exception as e:
+                        # Keep the numpy traversal if sklearn's tree
+                        # internals are not what we expect
+                        self.trees = False
+                        logger.warning(f"Could not rebuild sklearn trees, falling back to numpy: {e}")
+        return self.trees or None
+
+    def predict_proba(self, X):
+        """Average leaf probabilities over all trees for each row of X"""
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def apply(self, X):
+        """Leaf node id reached by each row in each tree, shape (rows, trees)"""
+        if self.delegate is not None and X.shape[0] >= DELEGATE_MIN_ROWS:
+            traversal = self.delegate
+        else:
+            traversal = self.compiled_trees() or self.delegate
+        if traversal is not None:
+            # sklearn numbers nodes per tree; offset them to global ids
+            return traversal.apply(X) + self.roots.astype(np.int64)
+        # Trees compare float32 feature values, like sklearn does
+        X = sp.csr_matrix(X, dtype=np.float32)
+        leaves = np.empty((X.shape[0], len(self.roots)), dtype=np.int64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            leaves[start:start + chunk.shape[0]] = self._apply_chunk(chunk)
+        return leaves
+
+    def _apply_chunk(self, X):
+        # Only the columns with a nonzero somewhere in this chunk are laid
+        # out densely; every other feature maps to a trailing all-zero
+        # column, so absent features take the zero branch without a lookup
+        # into the full vocabulary
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        columns = np.unique(X.indices)
+        width = len(columns) + 1
+        compact = np.full(n_features, len(columns), dtype=np.int64)
+        compact[columns] = np.arange(len(columns))
+        table = np.zeros((n_rows, width), dtype=np.float32)
+        table[:, :len(columns)] = X[:, columns].toarray()
+        table = table.ravel()
+
+        feature, threshold = self.feature, self.threshold
+        left, right = self.children_left, self.children_right
+
+        # One traversal state per (row, tree) pair, compacted as they finish
+        nodes = np.tile(np.asarray(self.roots, dtype=np.int64), n_rows)
+        offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * width, n_trees)
+        pairs = np.arange(n_rows * n_trees)
+        leaves = np.empty(n_rows * n_trees, dtype=np.int64)
+        while nodes.size:
+            for _ in range(STEPS_PER_SWEEP):
+                go_left = table[offsets + compact[feature[nodes]]] <= threshold[nodes]
+                nodes = np.where(go_left, left[nodes], right[nodes])
+            done = self.is_leaf(nodes)
+            if done.any():
+                leaves[pairs[done]] = nodes[done]
+                pending = ~done
+                nodes, offsets, pairs = nodes[pending], offsets[pending], pairs[pending]
+        return leaves.reshape(n_rows, n_trees)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class CompiledTrees:
+    """sklearn's Cython tree traversal, one tree after another.
+
+    The trees come from a loaded sklearn forest or are rebuilt from flat
+    arrays, e.g. with compiled artifacts. Its cost grows with the path each
+    row takes, not with the deepest path in the batch.
+    """
+
+    def __init__(self, trees):
+        self.trees = trees
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        return cls([estimator.tree_ for estimator in forest.estimators_])
+
+    @classmethod
+    def from_arrays(cls, forest):
+        from sklearn.tree._tree import NODE_DTYPE, Tree
+
+        n_features = int(forest.feature.max()) + 1
+        n_classes = np.array([forest.value.shape[1]], dtype=np.intp)
+        bounds = list(forest.roots) + [len(forest.feature)]
+        trees = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            ids = np.arange(start, end)
+            leaf = forest.children_left[start:end] == ids
+            nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+            nodes['left_child'] = np.where(leaf, LEAF, forest.children_left[start:end] - start)
+            nodes['right_child'] = np.where(leaf, LEAF, forest.children_right[start:end] - start)
+            nodes['feature'] = np.where(leaf, -2, forest.feature[start:end])
+            nodes['threshold'] = np.where(leaf, -2.0, forest.threshold[start:end])
+            tree = Tree(n_features, n_classes, 1)
+            tree.__setstate__({
+                'max_depth': _depth(nodes),
+                'node_count': end - start,
+                'nodes': nodes,
+                'values': np.ascontiguousarray(forest.value[start:end, None, :], dtype=np.float64)
+            })
+            trees.append(tree)
+        return cls(trees)
+
+    def apply(self, X):
+        """Leaf reached in each tree, numbered per tree like sklearn's forest.apply"""
+        X = sp.csr_matrix(X, dtype=np.float32)
+        X.sort_indices()
+        if X.shape[1] < self.trees[0].n_features:
+            X = sp.csr_matrix((X.data, X.indices, X.indptr), shape=(X.shape[0], self.trees[0].n_features))
+        return np.column_stack([tree.apply(X) for tree in self.trees])
+
+
+def _depth(nodes):
+    depth, level = 0, np.array([0])
+    while True:
+        children = np.concatenate([nodes['left_child'][level], nodes['right_child'][level]])
+        level = children[children != LEAF]
+        if not level.size:
+            return depth
+        depth += 1
@@ -0,0 +1,170 @@
+"""Group near-duplicate headlines with MinHash and locality-sensitive hashing.
+
+The same wire story appears across feeds with slightly different titles.
+Each title is reduced to a set of character shingles and a MinHash
+signature; signatures are split into bands, and titles sharing any band
+bucket are compared. A title whose estimated Jaccard similarity to a
+cluster's representative reaches the threshold joins that cluster,
+otherwise it starts a new one. Lookups cost the same however many titles
+are indexed, and the index holds at most ``max_clusters`` clusters.
+"""
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Shingles hashed per numpy pass
+CHUNK_SHINGLES = 8192
+
+# Multiply-shift hashing: one random odd multiplier and offset per
+# permutation; the top 32 bits of the 64-bit product are the hash
+_rng = np.random.RandomState(1)
+_A = (_rng.randint(0, 1 << 62, size=(NUM_PERM, 1), dtype=np.int64).astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+_B = _rng.randint(0, 1 << 62, size=(NUM_PERM, 1), dtype=np.int64).astype(np.uint64)
+_SHIFT = np.uint64(32)
+_BAND_MIX = _rng.randint(0, 1 << 62, size=ROWS, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+# "Headline - Reuters", "Headline | BBC News": outlet names appended by aggregators
+SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{1,40}$')
+
+
+def normalize(title):
+    title = SOURCE_SUFFIX.sub('', title or '')
+    return NON_ALNUM.sub(' ', title.lower()).strip()
+
+
+def shingle_hashes(titles):
+    """Every run of SHINGLE_SIZE bytes of each normalized title, as integers.
+
+    Returns the shingles of all titles concatenated, and how many belong
+    to each title. Titles are joined into one buffer and shingled in a
+    single pass; shingles spanning two titles are dropped.
+    """
+    texts = [normalize(title).encode('utf-8') for title in titles]
+    # Short titles are padded to one shingle; empty ones have none
+    texts = [text.ljust(SHINGLE_SIZE) if text else text for text in texts]
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    counts = np.maximum(lengths - SHINGLE_SIZE + 1, 0)
+    data = np.frombuffer(b''.join(texts), dtype=np.uint8).astype(np.uint64)
+    n = len(data) - SHINGLE_SIZE + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64), counts
+    shingles = data[:n].copy()
+    for i in range(1, SHINGLE_SIZE):
+        shingles |= data[i:i + n] << np.uint64(8 * i)
+    keep = np.ones(n, dtype=bool)
+    ends = np.cumsum(lengths)[lengths > 0]
+    crossing = (ends[:, None] - np.arange(SHINGLE_SIZE - 1, 0, -1)).ravel()
+    keep[crossing[crossing < n]] = False
+    return shingles[keep], counts
+
+
+def signatures(titles):
+    """MinHash signatures, shape (titles, NUM_PERM), and which titles have text"""
+    shingles, counts = shingle_hashes(titles)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    sigs = np.zeros((len(titles), NUM_PERM), dtype=np.uint64)
+    present = np.flatnonzero(counts)
+    # Hash blocks of titles small enough to stay in cache, then take the
+    # minimum per title
+    start = 0
+    while start < len(present):
+        end = np.searchsorted(offsets[present + 1], offsets[present[start]] + CHUNK_SHINGLES, side='right')
+        block = present[start:max(end, start + 1)]
+        permuted = _A * shingles[offsets[block[0]]:offsets[block[-1] + 1]]
+        permuted += _B
+        permuted >>= _SHIFT
+        sigs[block] = np.minimum.reduceat(permuted, offsets[block] - offsets[block[0]], axis=1).T
+        start += len(block)
+    return sigs, counts > 0
+
+
+def band_keys(sigs):
+    """One integer bucket key per band of each signature"""
+    # Candidates are verified against the full signature, so a rare
+    # collision between keys costs a comparison, not a wrong match
+    return (sigs.reshape(len(sigs), BANDS, ROWS) * _BAND_MIX).sum(axis=2)
+
+
+class HeadlineClusterer:
+    def __init__(self, threshold=0.5, max_clusters=10000):
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        # cluster id -> [representative signature, band keys, articles]
+        self._clusters = OrderedDict()
+        # One bucket table per band: band key -> cluster ids
+        self._buckets = [{} for _ in range(BANDS)]
+        self._next_id = 0
+
+    def add_many(self, articles):
+        """Assign articles to clusters in order; returns their cluster ids"""
+        sigs, present = signatures([article.get('title', '') for article in articles])
+        keys = band_keys(sigs).tolist()
+        return [self._add(article, sig if has_text else None, key if has_text else ())
+                for article, sig, key, has_text in zip(articles, sigs, keys, present)]
+
+    def add(self, article):
+        return self.add_many([article])[0]
+
+    def _add(self, article, sig, keys):
+        if sig is not None:
+            cluster_id = self._match(sig, keys)
+            if cluster_id is not None:
+                self._clusters[cluster_id][2].append(article)
+                return cluster_id
+
+        cluster_id = self._next_id
+        self._next_id += 1
+        self._clusters[cluster_id] = [sig, keys, [article]]
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, []).append(cluster_id)
+        if len(self._clusters) > self.max_clusters:
+            self._evict()
+        return cluster_id
+
+    def _match(self, sig, keys):
+        candidates = set()
+        for buckets, key in zip(self._buckets, keys):
+            bucket = buckets.get(key)
+            if bucket:
+                candidates.update(bucket)
+        best, best_similarity = None, self.threshold
+        for cluster_id in candidates:
+            similarity = np.count_nonzero(self._clusters[cluster_id][0] == sig) / NUM_PERM
+            # Ties go to the older cluster
+            if similarity > best_similarity or (similarity == best_similarity and
+                                                (best is None or cluster_id < best)):
+                best, best_similarity = cluster_id, similarity
+        return best
+
+    def _evict(self):
+        cluster_id, (_, keys, _) = self._clusters.popitem(last=False)
+        for buckets, key in zip(self._buckets, keys):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.remove(cluster_id)
+                if not bucket:
+                    del buckets[key]
+
+    def clusters(self):
+        """One article per cluster, oldest first, annotated with its members' sources"""
+        results = []
+        for _, _, members in self._clusters.values():
+            sources = list(dict.fromkeys(m.get('source') for m in members if m.get('source')))
+            results.append({**members[0], 'sources': sources, 'cluster_size': len(members)})
+        return results
+
+    def __len__(self):
+        return len(self._clusters)
+
+
+def cluster_articles(articles, threshold=0.5):
+    """Collapse near-duplicate articles, keeping the first of each cluster"""
+    clusterer = HeadlineClusterer(threshold, max_clusters=max(len(articles), 1))
+    clusterer.add_many(articles)
+    return clusterer.clusters()
@@ -0,0 +1,87 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    """Raised by MicroBatcher.submit when the pending queue is full"""
+
+
+class MicroBatcher:
+    """Collect single items from many threads and score them in batches.
+
+    A worker thread takes the first queued item, waits up to ``max_wait``
+    seconds for more (or until ``max_batch_size`` items are queued), then
+    calls ``score_batch`` once on the whole batch. ``score_batch`` must
+    return one result per item, in order. Each caller gets a Future that
+    resolves to its own result.
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait=0.005, max_queue=1024):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.last_batch_size = 0
+        self.max_seen_batch_size = 0
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise QueueFull(f"More than {self._queue.maxsize} requests pending")
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.score_batch(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.last_batch_size = len(batch)
+                self.max_seen_batch_size = max(self.max_seen_batch_size, len(batch))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self._queue.maxsize,
+                'batches': self.batches,
+                'items': self.items,
+                'rejected': self.rejected,
+                'last_batch_size': self.last_batch_size,
+                'max_batch_size_seen': self.max_seen_batch_size,
+                'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0
+            }
@@ -1,51 +1,224 @@
-import re
 import requests
 from bs4 import BeautifulSoup
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
 import numpy as np
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 import pickle
 import os
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from preprocessing import TextPreprocessor
+from prediction_cache import PredictionCache
+import artifacts
+from forest_engine import ArrayForest
+import metrics
+import online_model
+from explanations import build_explainer
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-    
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+logger = logging.getLogger(__name__)
+
+# A vectorizer/model pair plus where and when it was loaded, and the
+# contribution tables used to explain its predictions
+ModelBundle = namedtuple('ModelBundle', 'vectorizer model version source loaded_at load_seconds explainer')
 
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+# Scored once by warm_up() before a newly loaded model is swapped in
+WARM_UP_HEADLINE = "Government announces new infrastructure plan"
+
+STAGE_SECONDS = metrics.histogram('fakenews_stage_seconds',
+                                  'Time spent in each prediction stage', ('stage',))
+PREDICTIONS = metrics.counter('fakenews_predictions_total',
+                              'Headlines scored, by whether the cache answered', ('cached',))
+PREDICTION_ERRORS = metrics.counter('fakenews_prediction_errors_total', 'Batches that failed to score')
 
 class FakeNewsDetector:
-    def __init__(self):
-        model_path = os.path.join('models', 'model.pkl')
-        vectorizer_path = os.path.join('models', 'vectorizer.pkl')
-        if os.path.exists(model_path) and os.path.exists(vectorizer_path):
+    def __init__(self, cache_size=10000, cache_ttl=None, model_dir='models',
+                 artifact_format='auto', lazy=True, engine='tfidf', compile_forest=True):
+        # Cache of scored headlines keyed on preprocessed text; cleared
+        # whenever the model or vectorizer is replaced
+        self.cache = PredictionCache(max_size=cache_size, ttl=cache_ttl)
+        self.model_dir = model_dir
+        # 'compiled' (memory-mapped arrays), 'pickle', or 'auto' to prefer
+        # compiled artifacts when they have been exported
+        self.artifact_format = artifact_format
+        # 'tfidf' for the trained TF-IDF model, or 'online' for the hashing
+        # vectorizer + SGD model that supports partial_fit
+        self.engine = engine
+        # Score pickled RandomForests with the flat-array engine
+        self.compile_forest = compile_forest
+        # The vectorizer and model are always replaced together as one
+        # bundle, so a prediction never pairs one with the other's successor
+        self._bundle = None
+        self._preprocessor = None
+        self._load_lock = threading.RLock()
+        # Loading and the NLTK checks are deferred to the first prediction
+        # unless lazy is False
+        if not lazy:
+            self.load()
+
+    def model_files(self):
+        """Files whose contents determine the loaded model"""
+        if self.engine == 'online':
+            return [online_model.online_path(self.model_dir)]
+        return [
+            os.path.join(artifacts.compiled_path(self.model_dir), artifacts.MANIFEST),
+            os.path.join(self.model_dir, 'model.pkl'),
+            os.path.join(self.model_dir, 'vectorizer.pkl')
+        ]
+
+    def model_fingerprint(self):
+        """Cheap version id from the size and mtime of the model files"""
+        parts = []
+        for path in self.model_files():
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append((path, stat.st_size, stat.st_mtime_ns))
+        if not parts:
+            return 'demo'
+        return hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+
+    def build_bundle(self):
+        """Load a new vectorizer and model from disk without installing them"""
+        start = time.perf_counter()
+        version = self.model_fingerprint()
+        if self.engine == 'online':
+            vectorizer, model = self._load_online()
+            source = 'online'
+        else:
+            vectorizer, model, source = self._load_tfidf()
+        explainer = build_explainer(vectorizer, model)
+        return ModelBundle(vectorizer, model, version, source, time.time(),
+                           round(time.perf_counter() - start, 3), explainer)
+
+    def _load_tfidf(self):
+        compiled_dir = artifacts.compiled_path(self.model_dir)
+        model_path = os.path.join(self.model_dir, 'model.pkl')
+        vectorizer_path = os.path.join(self.model_dir, 'vectorizer.pkl')
+        has_compiled = artifacts.has_artifacts(compiled_dir)
+        has_pickles = os.path.exists(model_path) and os.path.exists(vectorizer_path)
+        if self.artifact_format == 'compiled' and not has_compiled:
+            raise FileNotFoundError(f"No compiled artifacts in {compiled_dir}; run `python artifacts.py`")
+        if self.artifact_format == 'pickle' and not has_pickles:
+            raise FileNotFoundError(f"No model.pkl and vectorizer.pkl in {self.model_dir}")
+        if has_compiled and self.artifact_format == 'auto' and has_pickles \
+                and not artifacts.is_current(compiled_dir, self.model_dir):
+            # The pickles changed since the export; they are the newer model
+            logger.warning(f"{compiled_dir} is older than the pickles and is ignored; "
+                           f"re-export with `python artifacts.py`")
+            has_compiled = False
+        if self.artifact_format != 'pickle' and has_compiled:
+            vectorizer, model = artifacts.load_artifacts(compiled_dir)
+            return vectorizer, model, 'compiled'
+        if self.artifact_format != 'compiled' and has_pickles:
             with open(vectorizer_path, 'rb') as f:
-                self.vectorizer = pickle.load(f)
+                vectorizer = pickle.load(f)
             with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            self.stop_words = set(stopwords.words('english'))
-            self.lemmatizer = WordNetLemmatizer()
-        else:
-            # Fallback to demo training if no model is found
-            self.vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
-            self.model = LogisticRegression()
-            self.stop_words = set(stopwords.words('english'))
-            self.lemmatizer = WordNetLemmatizer()
-            self._train_model()
+                model = pickle.load(f)
+            if self.compile_forest and hasattr(model, 'estimators_'):
+                model = ArrayForest.from_sklearn(model, keep_delegate=True)
+            return vectorizer, model, 'pickle'
+        # Fallback to demo training if no model is found
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
+        model = LogisticRegression()
+        self._train_model(vectorizer, model)
+        return vectorizer, model, 'demo'
+
+    def _load_online(self):
+        path = online_model.online_path(self.model_dir)
+        if os.path.exists(path):
+            return online_model.load_online(path)
+        # Start from the demo headlines until feedback arrives
+        vectorizer, model = online_model.build_vectorizer(), online_model.build_model()
+        self._train_model(vectorizer, model)
+        return vectorizer, model
+
+    def warm_up(self, bundle):
+        """Run one prediction through a bundle before it serves traffic"""
+        X = bundle.vectorizer.transform([self.preprocess_text(WARM_UP_HEADLINE)])
+        bundle.model.predict_proba(X)
+
+    def swap(self, bundle):
+        """Atomically replace the live vectorizer and model"""
+        self._bundle = bundle
+        self.cache.clear()
+
+    def load(self):
+        """Load the vectorizer and model if they are not loaded yet"""
+        with self._load_lock:
+            if self._bundle is None:
+                self.swap(self.build_bundle())
+
+    @property
+    def bundle(self):
+        if self._bundle is None:
+            self.load()
+        return self._bundle
+
+    def status(self):
+        bundle = self._bundle
+        if bundle is None:
+            return {'loaded': False, 'engine': self.engine}
+        return {
+            'loaded': True,
+            'engine': self.engine,
+            'version': bundle.version,
+            'source': bundle.source,
+            'loaded_at': datetime.fromtimestamp(bundle.loaded_at).isoformat(),
+            'load_seconds': bundle.load_seconds
+        }
+
+    def partial_fit(self, headlines, labels, save=True):
+        """Fold labeled headlines (0=fake, 1=real) into the online model.
+
+        The update is applied to a copy which then replaces the live model,
+        so concurrent predictions never see a half-updated model.
+        """
+        if self.engine != 'online':
+            raise ValueError("partial_fit requires engine='online'")
+        processed = self.preprocessor.preprocess_batch(headlines)
+        with self._load_lock:
+            bundle = self.bundle
+            X = bundle.vectorizer.transform(processed)
+            model = copy.deepcopy(bundle.model)
+            model.partial_fit(X, labels, classes=online_model.CLASSES)
+            if save:
+                online_model.save_online(model, online_model.online_path(self.model_dir))
+            version = self.model_fingerprint() if save else f"{bundle.version}+"
+            self.swap(bundle._replace(model=model, version=version, loaded_at=time.time(),
+                                      explainer=build_explainer(bundle.vectorizer, model)))
+        return len(processed)
+
+    @property
+    def preprocessor(self):
+        if self._preprocessor is None:
+            with self._load_lock:
+                if self._preprocessor is None:
+                    self._preprocessor = TextPreprocessor()
+        return self._preprocessor
+
+    @property
+    def vectorizer(self):
+        return self.bundle.vectorizer
+
+    @vectorizer.setter
+    def vectorizer(self, vectorizer):
+        bundle = self.bundle
+        self.swap(bundle._replace(vectorizer=vectorizer, explainer=build_explainer(vectorizer, bundle.model)))
+
+    @property
+    def model(self):
+        return self.bundle.model
+
+    @model.setter
+    def model(self, model):
+        bundle = self.bundle
+        self.swap(bundle._replace(model=model, explainer=build_explainer(bundle.vectorizer, model)))
     
-    def _train_model(self):
+    def _train_model(self, vectorizer, model):
         # Expanded demo training data - for real use, load a large labeled dataset
         fake_headlines = [
             "Scientists discover aliens living among us",
@@ -90,47 +263,100 @@ class FakeNewsDetector:
         labels = [0] * len(fake_headlines) + [1] * len(real_headlines)  # 0=fake, 1=real
         
         # Preprocess all headlines
-        processed_headlines = [self.preprocess_text(h) for h in headlines]
+        processed_headlines = self.preprocessor.preprocess_batch(headlines)
         
         # Train the model
-        X = self.vectorizer.fit_transform(processed_headlines)
-        self.model.fit(X, labels)
+        X = vectorizer.fit_transform(processed_headlines)
+        model.fit(X, labels)
     
     def preprocess_text(self, text):
         # Clean and preprocess text with tokenization and lemmatization
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        tokens = nltk.word_tokenize(text)
-        tokens = [self.lemmatizer.lemmatize(word) for word in tokens if word not in self.stop_words]
-        return ' '.join(tokens)
+        with STAGE_SECONDS.time(stage='preprocess'):
+            return self.preprocessor.preprocess(text)
     
-    def predict(self, headline):
+    def predict(self, headline, explain=False, top_terms=5):
+        return self.predict_batch([headline], explain=explain, top_terms=top_terms)[0]
+
+    def predict_batch(self, headlines, explain=False, top_terms=5, use_cache=True):
+        """Score a list of headlines with one vectorize and one predict_proba pass.
+
+        With explain=True each result also gets an 'explanation': the
+        top_terms terms that moved its score most. Explained batches skip
+        the cache and take their scores from the same pass that explains
+        them. use_cache=False neither reads nor fills the cache, for text
+        that is not worth keeping, like article body chunks.
+        """
+        headlines = list(headlines)
+        if not headlines:
+            return []
         try:
-            # Preprocess the headline
-            processed = self.preprocess_text(headline)
-            
-            # Vectorize and predict
-            X = self.vectorizer.transform([processed])
-            prediction = self.model.predict(X)[0]
-            probability = self.model.predict_proba(X)[0]
-            
-            # Get confidence score
-            confidence = max(probability) * 100
-            
-            return {
-                'prediction': 'Real' if prediction == 1 else 'Fake',
-                'confidence': round(confidence, 2),
-                'is_real': bool(prediction),
-                'headline': headline
-            }
+            # Preprocess all headlines
+            with STAGE_SECONDS.time(stage='preprocess'):
+                processed = self.preprocessor.preprocess_batch(headlines)
+
+            # Answer repeats from the cache and group the rest by processed
+            # text so duplicates within the batch are scored once
+            results = [None] * len(headlines)
+            missing = {}
+            for i, (headline, text) in enumerate(zip(headlines, processed)):
+                cached = self.cache.get(text) if use_cache and not explain else None
+                if cached is not None:
+                    results[i] = {**cached, 'headline': headline}
+                else:
+                    missing.setdefault(text, []).append(i)
+
+            if missing:
+                # Read the generation before the bundle: if a swap lands in
+                # between, these results are simply not cached
+                self.load()
+                generation = self.cache.generation
+                bundle = self.bundle
+                vectorizer, model = bundle.vectorizer, bundle.model
+                texts = list(missing)
+
+                # Vectorize as one sparse matrix and score it in a single pass;
+                # the label is the argmax of the probabilities, which is what
+                # model.predict would compute by walking the trees again
+                with STAGE_SECONDS.time(stage='vectorize'):
+                    X = vectorizer.transform(texts)
+                explanations = None
+                if explain and bundle.explainer is not None:
+                    with STAGE_SECONDS.time(stage='explain'):
+                        probabilities, explanations = bundle.explainer.predict_proba_explain(X, texts, top_terms)
+                else:
+                    with STAGE_SECONDS.time(stage='predict'):
+                        probabilities = model.predict_proba(X)
+                predictions = model.classes_[probabilities.argmax(axis=1)]
+
+                for j, (text, prediction, probability) in enumerate(zip(texts, predictions, probabilities)):
+                    # Get confidence score
+                    confidence = max(probability) * 100
+
+                    scored = {
+                        'prediction': 'Real' if prediction == 1 else 'Fake',
+                        'confidence': round(confidence, 2),
+                        'is_real': bool(prediction),
+                        'model_version': bundle.version
+                    }
+                    if use_cache:
+                        self.cache.put(text, scored, generation)
+                    for i in missing[text]:
+                        results[i] = {**scored, 'headline': headlines[i]}
+                        if explain:
+                            results[i]['explanation'] = None if explanations is None else explanations[j]
+            scored_count = sum(len(indices) for indices in missing.values())
+            PREDICTIONS.inc(scored_count, cached='false')
+            PREDICTIONS.inc(len(headlines) - scored_count, cached='true')
+            return results
         except Exception as e:
-            return {
+            PREDICTION_ERRORS.inc()
+            return [{
                 'prediction': 'Error',
                 'confidence': 0,
                 'is_real': False,
                 'headline': headline,
                 'error': str(e)
-            }
+            } for headline in headlines]
 
 def fetch_recent_news(query="latest news", num_articles=5):
     """Fetch recent news headlines"""
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Reload the detector's model when its files change, without downtime.
+
+    A watcher thread polls the detector's model files every poll_interval
+    seconds; ``request_reload`` triggers the same work on demand. New models
+    are loaded and warmed up on a background thread while the current one
+    keeps serving, then swapped in with a single reference assignment.
+    """
+
+    def __init__(self, detector, poll_interval=30):
+        self.detector = detector
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.last_error = None
+        self.last_checked = None
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._watcher = None
+        self._seen_fingerprint = None
+
+    def start(self):
+        if self.poll_interval and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.last_checked = time.time()
+            if self.changed():
+                self.reload()
+
+    def changed(self):
+        """True if the files on disk differ from the loaded model.
+
+        A new fingerprint must be seen on two consecutive polls, so a model
+        that is still being written is not picked up half-way.
+        """
+        bundle = self.detector._bundle
+        if bundle is None:
+            # Nothing loaded yet; the first prediction will load the latest
+            return False
+        fingerprint = self.detector.model_fingerprint()
+        stable = fingerprint == self._seen_fingerprint
+        self._seen_fingerprint = fingerprint
+        return stable and fingerprint != bundle.version
+
+    def request_reload(self):
+        """Start a reload in the background; False if one is already running"""
+        if self._reloading:
+            return False
+        threading.Thread(target=self.reload, name='model-reload', daemon=True).start()
+        return True
+
+    def reload(self):
+        """Load, warm up and swap in the model currently on disk"""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self._reloading = True
+        try:
+            bundle = self.detector.build_bundle()
+            self.detector.warm_up(bundle)
+            self.detector.swap(bundle)
+            self.reloads += 1
+            self.last_error = None
+            logger.info(f"Loaded model {bundle.version} from {bundle.source} in {bundle.load_seconds}s")
+            return True
+        except Exception as e:
+            # Keep serving the previous model
+            self.last_error = str(e)
+            logger.error(f"Model reload failed: {e}")
+            return False
+        finally:
+            self._reloading = False
+            self._reload_lock.release()
+
+    def status(self):
+        return {
+            **self.detector.status(),
+            'reloading': self._reloading,
+            'reloads': self.reloads,
+            'last_error': self.last_error,
+            'poll_interval': self.poll_interval
+        }
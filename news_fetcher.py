@@ -1,13 +1,55 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
 import logging
-import time
+import threading
+import metrics
+from headline_clusters import cluster_articles
 
 logger = logging.getLogger(__name__)
 
+FETCH_SECONDS = metrics.histogram('fakenews_feed_fetch_seconds', 'Time to fetch one feed', ('feed',))
+FETCHES = metrics.counter('fakenews_feed_fetches_total', 'Feed fetches by outcome', ('feed', 'status'))
+DUPLICATES = metrics.counter('fakenews_feed_duplicates_total', 'Articles folded into a near-duplicate cluster')
+
 class NewsFetcher:
-    def __init__(self):
+    def __init__(self, max_workers=16, per_host_limit=2, feed_timeout=5, refresh_timeout=0.9,
+                 dedup_threshold=0.5, store=None):
+        # Feeds are fetched concurrently over one pooled session; at most
+        # per_host_limit requests run against the same host at a time, and
+        # the rest wait in a per-host queue without holding a worker
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.feed_timeout = feed_timeout
+        self.refresh_timeout = refresh_timeout
+        # Minimum estimated title similarity for two articles to be treated
+        # as one story; None keeps every article
+        self.dedup_threshold = dedup_threshold
+        # ArticleStore holding every scored article, searched by search_news
+        self.store = store
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = None
+        # Fetches running per host, and (feed URL, future) pairs waiting
+        # for one of them to finish
+        self._host_active = {}
+        self._host_queues = {}
+        # Last successfully parsed articles per feed URL, with its ETag /
+        # Last-Modified validators when the feed sends them
+        self._feed_cache = {}
+        # Fetches still running past a refresh deadline; the next refresh
+        # waits on them instead of starting another request
+        self._inflight = {}
+        # Feeds the last refresh gave up waiting for
+        self.pending_feeds = 0
+        self._lock = threading.Lock()
+
         # You can get free API keys from these services
         self.news_apis = {
             'newsapi': {
@@ -107,7 +149,8 @@ class NewsFetcher:
                 'sortBy': 'publishedAt'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            with FETCH_SECONDS.time(feed='newsapi'):
+                response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -122,19 +165,64 @@ class NewsFetcher:
                         'published_at': article.get('publishedAt', '')
                     })
             
+            FETCHES.inc(feed='newsapi', status='ok')
             logger.info(f"Fetched {len(articles)} articles from NewsAPI")
             return articles
             
         except Exception as e:
+            FETCHES.inc(feed='newsapi', status='error')
             logger.error(f"Error fetching from NewsAPI: {str(e)}")
             return []
 
+    def _schedule(self, feed_url):
+        """Future for one feed fetch, started now or once its host has a free slot"""
+        # Called with self._lock held
+        future = Future()
+        host = urlsplit(feed_url).netloc
+        if self._host_active.get(host, 0) < self.per_host_limit:
+            self._host_active[host] = self._host_active.get(host, 0) + 1
+            self._executor.submit(self._run_fetch, host, feed_url, future)
+        else:
+            self._host_queues.setdefault(host, deque()).append((feed_url, future))
+        return future
+
+    def _run_fetch(self, host, feed_url, future):
+        while True:
+            try:
+                future.set_result(self.fetch_from_rss(feed_url))
+            except Exception as e:
+                future.set_exception(e)
+            # Hand this host's slot to the next queued feed on this worker
+            with self._lock:
+                queue = self._host_queues.get(host)
+                if not queue:
+                    self._host_active[host] -= 1
+                    self._host_queues.pop(host, None)
+                    return
+                feed_url, future = queue.popleft()
+
     def fetch_from_rss(self, feed_url):
-        """Fetch news from RSS feed"""
+        """Fetch news from RSS feed, reusing the last result on 304 Not Modified"""
         try:
             import feedparser
-            
-            feed = feedparser.parse(feed_url)
+
+            cached = self._feed_cache.get(feed_url)
+            headers = {}
+            if cached:
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            with FETCH_SECONDS.time(feed=feed_url):
+                response = self.session.get(feed_url, headers=headers, timeout=self.feed_timeout)
+
+            if response.status_code == 304 and cached:
+                FETCHES.inc(feed=feed_url, status='not_modified')
+                return list(cached['articles'])
+            response.raise_for_status()
+
+            feed = feedparser.parse(response.content)
             articles = []
             
             for entry in feed.entries[:5]:  # Limit to 5 per feed
@@ -146,24 +234,55 @@ class NewsFetcher:
                         'source': feed.feed.get('title', 'RSS Feed'),
                         'published_at': entry.get('published', '')
                     })
+
+            # Kept even without validators, as the fallback for a refresh
+            # this feed is too slow for
+            self._feed_cache[feed_url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'articles': articles
+            }
             
-            return articles
+            FETCHES.inc(feed=feed_url, status='ok')
+            return list(articles)
             
         except ImportError:
             logger.warning("feedparser not installed, skipping RSS feeds")
             return []
         except Exception as e:
+            FETCHES.inc(feed=feed_url, status='error')
             logger.error(f"Error fetching RSS from {feed_url}: {str(e)}")
             return []
 
     def fetch_all_rss(self):
-        """Fetch news from all RSS feeds"""
+        """Fetch news from all RSS feeds concurrently"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='rss-fetch')
+        with self._lock:
+            futures = []
+            for feed_url in self.rss_feeds:
+                future = self._inflight.get(feed_url)
+                if future is None or future.done():
+                    future = self._inflight[feed_url] = self._schedule(feed_url)
+                futures.append(future)
+
+        # Feeds that miss the refresh deadline contribute their last known
+        # articles this cycle and keep fetching in the background; what
+        # they return is cached for the next cycle
+        done, not_done = wait(futures, timeout=self.refresh_timeout)
+        self.pending_feeds = len(not_done)
+        if not_done:
+            logger.warning(f"{len(not_done)} RSS feeds did not respond within {self.refresh_timeout}s")
+
         all_articles = []
-        
-        for feed_url in self.rss_feeds:
-            articles = self.fetch_from_rss(feed_url)
-            all_articles.extend(articles)
-            time.sleep(0.5)  # Be nice to servers
+        for feed_url, future in zip(self.rss_feeds, futures):
+            if future in done:
+                all_articles.extend(future.result())
+                continue
+            FETCHES.inc(feed=feed_url, status='deadline')
+            if feed_url in self._feed_cache:
+                all_articles.extend(self._feed_cache[feed_url]['articles'])
         
         logger.info(f"Fetched {len(all_articles)} articles from RSS feeds")
         return all_articles
@@ -182,8 +301,9 @@ class NewsFetcher:
                 rss_articles = self.fetch_all_rss()
                 articles.extend(rss_articles)
             
-            # If still no articles, use sample data for demo
-            if not articles:
+            # If still no articles, use sample data for demo; feeds that are
+            # only slow will have news for a later refresh instead
+            if not articles and not self.pending_feeds:
                 logger.info("Using sample news data for demonstration")
                 articles = self.sample_news.copy()
             
@@ -191,6 +311,13 @@ class NewsFetcher:
             articles = sorted(articles, 
                             key=lambda x: x.get('published_at', ''), 
                             reverse=True)
+
+            # Syndicated copies collapse into their newest version, which
+            # lists every source that carried the story
+            if self.dedup_threshold is not None:
+                fetched = len(articles)
+                articles = cluster_articles(articles, self.dedup_threshold)
+                DUPLICATES.inc(fetched - len(articles))
             
             logger.info(f"Total articles fetched: {len(articles)}")
             return articles
@@ -200,10 +327,13 @@ class NewsFetcher:
             # Return sample data as fallback
             return self.sample_news.copy()
 
-    def search_news(self, query):
+    def search_news(self, query, limit=50):
         """Search for news articles containing specific keywords"""
         try:
-            # For demo, filter sample news by query
+            if self.store is not None:
+                return self.store.search(query, limit=limit)[0]
+
+            # Without a store, filter sample news by query
             filtered_articles = []
             query_lower = query.lower()
             
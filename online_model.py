@@ -0,0 +1,45 @@
+"""Online engine: stateless hashing vectorizer plus an SGD linear model.
+
+Unlike the TF-IDF engine there is no fitted vocabulary, so new labeled
+headlines can be folded in with ``partial_fit`` and the artifact stays the
+same size however many distinct terms it has seen.
+"""
+import os
+import pickle
+
+import numpy as np
+
+# Number of hashed feature columns; fixes the artifact at N_FEATURES weights
+N_FEATURES = 2 ** 18
+CLASSES = np.array([0, 1])  # 0=fake, 1=real
+
+
+def build_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), stop_words='english',
+                             alternate_sign=False, norm='l2')
+
+
+def build_model():
+    from sklearn.linear_model import SGDClassifier
+    # log_loss gives the calibrated predict_proba the detector reports
+    return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+
+
+def online_path(model_dir='models'):
+    return os.path.join(model_dir, 'online', 'model.pkl')
+
+
+def save_online(model, path):
+    """Atomically replace the saved online model"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, path)
+
+
+def load_online(path):
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+    return build_vectorizer(), model
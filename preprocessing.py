@@ -0,0 +1,94 @@
+import re
+import threading
+from functools import lru_cache
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+# Anything that is not a letter or whitespace is dropped before tokenizing
+NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+# After NON_LETTERS only lowercase letters and whitespace are left, so
+# nltk.word_tokenize reduces to a whitespace split plus the Treebank
+# contraction rules that match whole letter-only words
+CONTRACTIONS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+# Bump whenever preprocess() output changes, to invalidate cached corpora
+PREPROCESSING_VERSION = 1
+
+# Upper bound on distinct tokens kept in the lemma cache
+LEMMA_CACHE_SIZE = 100000
+
+
+_nltk_checked = False
+_nltk_lock = threading.Lock()
+
+
+def ensure_nltk_data():
+    """Download the NLTK corpora the preprocessor needs, once per process"""
+    global _nltk_checked
+    if _nltk_checked:
+        return
+    with _nltk_lock:
+        if _nltk_checked:
+            return
+        for resource, package in (('corpora/stopwords', 'stopwords'), ('corpora/wordnet', 'wordnet')):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                nltk.download(package)
+        _nltk_checked = True
+
+
+class TextPreprocessor:
+    """Lowercase, strip, tokenize, drop stopwords and lemmatize headlines.
+
+    Produces exactly the same strings as the original
+    ``lower -> re.sub -> nltk.word_tokenize -> lemmatize`` pipeline, so
+    models trained with either stay valid.
+    """
+
+    def __init__(self, cache_size=LEMMA_CACHE_SIZE):
+        ensure_nltk_data()
+        self.stop_words = frozenset(stopwords.words('english'))
+        self.lemmatizer = WordNetLemmatizer()
+        # Maps a token to its lemma, or None for stopwords
+        self._lemma = lru_cache(maxsize=cache_size)(self._lemmatize_token)
+
+    def _lemmatize_token(self, token):
+        if token in self.stop_words:
+            return None
+        return self.lemmatizer.lemmatize(token)
+
+    def tokenize(self, text):
+        """Equivalent of nltk.word_tokenize for letter-and-space-only text"""
+        tokens = []
+        for word in text.split():
+            expanded = CONTRACTIONS.get(word)
+            if expanded:
+                tokens.extend(expanded)
+            else:
+                tokens.append(word)
+        return tokens
+
+    def preprocess(self, text):
+        text = NON_LETTERS.sub('', str(text).lower())
+        lemma = self._lemma
+        lemmas = [lemma(token) for token in self.tokenize(text)]
+        return ' '.join([l for l in lemmas if l is not None])
+
+    def preprocess_batch(self, texts):
+        """Preprocess an iterable of texts, returning a list of strings"""
+        preprocess = self.preprocess
+        return [preprocess(text) for text in texts]
+
+    def cache_info(self):
+        return self._lemma.cache_info()
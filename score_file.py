@@ -0,0 +1,205 @@
+"""Score a CSV or JSONL file of headlines offline.
+
+Rows are read as a stream and scored in chunks across a process pool.
+Each worker loads the model once. Results are written in input order as
+soon as the next chunk is done. A checkpoint next to the output records
+how far the run got; running the same command again resumes from there.
+
+    python score_file.py models/True.csv -o true_scored.jsonl
+    python score_file.py archive.jsonl --field headline --keep id -o scored.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from model import FakeNewsDetector
+
+# Fields tried, in order, when --field is not given
+HEADLINE_FIELDS = ('headline', 'title', 'text')
+RESULT_FIELDS = ('headline', 'prediction', 'confidence', 'is_real', 'model_version', 'error')
+
+# One detector per worker process, built by the pool initializer, and how
+# many explanation terms to attach (0 for none)
+_worker_detector = None
+_worker_explain = 0
+
+def _init_worker(model_dir, explain=0):
+    global _worker_detector, _worker_explain
+    _worker_detector = FakeNewsDetector(model_dir=model_dir)
+    _worker_detector.load()
+    _worker_explain = explain
+
+def _score_chunk(headlines):
+    return _worker_detector.predict_batch(headlines, explain=bool(_worker_explain),
+                                          top_terms=_worker_explain or 5)
+
+def file_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+def read_rows(path, fmt):
+    """Yield each input row as a dict, without loading the file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            # Article bodies in the training CSVs exceed the default limit
+            csv.field_size_limit(sys.maxsize)
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def read_chunks(rows, field, keep, chunk_size, skip=0):
+    """Group rows into chunks of (headlines, kept fields), skipping the first ``skip``"""
+    headlines, kept = [], []
+    for index, row in enumerate(rows):
+        if index < skip:
+            continue
+        if field is None:
+            field = next((name for name in HEADLINE_FIELDS if name in row), None)
+            if field is None:
+                raise SystemExit(f"No headline field found; pass --field (row has {sorted(row)})")
+        headlines.append(str(row.get(field) or ''))
+        kept.append({name: row.get(name) for name in keep})
+        if len(headlines) == chunk_size:
+            yield headlines, kept
+            headlines, kept = [], []
+    if headlines:
+        yield headlines, kept
+
+class ResultWriter:
+    """Append results to a CSV or JSONL file"""
+
+    def __init__(self, path, fmt, keep, resume_at=None, explain=False):
+        self.fmt = fmt
+        self.fields = ['row', *keep, *RESULT_FIELDS] + (['explanation'] if explain else [])
+        if resume_at is not None:
+            self.f = open(path, 'r+', newline='', encoding='utf-8')
+            # Drop anything written after the last checkpoint
+            self.f.truncate(resume_at)
+            self.f.seek(resume_at)
+        else:
+            self.f = open(path, 'w', newline='', encoding='utf-8')
+        self.csv = csv.DictWriter(self.f, self.fields, extrasaction='ignore') if fmt == 'csv' else None
+        if self.csv is not None and resume_at is None:
+            self.csv.writeheader()
+
+    def write(self, first_row, kept, results):
+        for offset, (fields, result) in enumerate(zip(kept, results)):
+            record = {'row': first_row + offset, **fields, **result}
+            if self.csv is not None:
+                if 'explanation' in record:
+                    record['explanation'] = json.dumps(record['explanation'])
+                self.csv.writerow(record)
+            else:
+                self.f.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        """Flush to disk and return the file size"""
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+def input_fingerprint(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+def load_checkpoint(path, fingerprint):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != fingerprint:
+        raise SystemExit(f"{path} belongs to a different input file; delete it or pass --restart")
+    return checkpoint
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def print_summary(scored, resumed, elapsed, labels, errors):
+    rate = scored / elapsed if elapsed else 0.0
+    print(f"Scored {scored} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    if resumed:
+        print(f"Resumed after {resumed} rows from a previous run")
+    for label, count in sorted(labels.items()):
+        print(f"  {label:<8}{count:>12}")
+    if errors:
+        print(f"  {'errors':<8}{errors:>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV or JSONL file of headlines')
+    parser.add_argument('input', help='CSV or JSONL file')
+    parser.add_argument('-o', '--output', help='results file, .csv or .jsonl (default: <input>.scored.jsonl)')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help='default: from the file extension')
+    parser.add_argument('--field', help=f"headline field (default: first of {', '.join(HEADLINE_FIELDS)})")
+    parser.add_argument('--keep', action='append', default=[],
+                        help='input field copied to each result, e.g. an id (repeatable)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='scoring processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='headlines per scoring task')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--explain', type=int, default=0, metavar='K',
+                        help='attach the K terms that moved each score most')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.scored.jsonl"
+    checkpoint_path = f"{output}.checkpoint"
+    fingerprint = input_fingerprint(args.input)
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, fingerprint)
+    resumed = checkpoint['rows'] if checkpoint else 0
+
+    rows = read_rows(args.input, file_format(args.input, args.input_format))
+    chunks = read_chunks(rows, args.field, args.keep, args.chunk_size, skip=resumed)
+    writer = ResultWriter(output, file_format(output), args.keep,
+                          resume_at=checkpoint['bytes'] if checkpoint else None, explain=args.explain > 0)
+
+    labels, errors, done = Counter(), 0, resumed
+    start = time.perf_counter()
+    # Bounded look-ahead: at most two chunks per worker are in flight or
+    # waiting to be written, however large the input
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.model_dir, args.explain)) as pool:
+        def fill():
+            while len(pending) < 2 * args.workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                headlines, kept = chunk
+                pending.append((kept, pool.submit(_score_chunk, headlines)))
+
+        fill()
+        while pending:
+            kept, future = pending.popleft()
+            results = future.result()
+            writer.write(done, kept, results)
+            for result in results:
+                if 'error' in result:
+                    errors += 1
+                else:
+                    labels[result['prediction']] += 1
+            done += len(results)
+            save_checkpoint(checkpoint_path, {'input': fingerprint, 'rows': done, 'bytes': writer.flush()})
+            fill()
+    writer.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f"Wrote {output}")
+    print_summary(done - resumed, resumed, time.perf_counter() - start, labels, errors)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """Serve the last value of an expensive loader, refreshing it in the background.
+
+    ``get`` returns the current snapshot straight away. If it is older than
+    ``max_age`` a refresh starts on a background thread. At most one refresh
+    runs at a time: callers that ask while one is in flight share it
+    instead of starting their own.
+    """
+
+    def __init__(self, loader, max_age=60, first_wait=10):
+        self.loader = loader
+        self.max_age = max_age
+        # How long get() blocks when there is no snapshot at all yet
+        self.first_wait = first_wait
+        # (value, monotonic time it was produced), replaced as one object
+        self._snapshot = None
+        self._inflight = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.coalesced = 0
+        self.last_error = None
+
+    def age(self):
+        snapshot = self._snapshot
+        return None if snapshot is None else time.monotonic() - snapshot[1]
+
+    def is_stale(self):
+        age = self.age()
+        return age is None or age >= self.max_age
+
+    @property
+    def refreshing(self):
+        return self._inflight is not None
+
+    @property
+    def value(self):
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot[0]
+
+    def refresh(self, wait=True, timeout=None):
+        """Run the loader, or join the refresh already in flight.
+
+        With a ``timeout`` the loader always runs on a background thread, so
+        the owner gives up after ``timeout`` like everyone else and the
+        refresh still completes for later callers.
+        """
+        with self._lock:
+            event = self._inflight
+            owner = event is None
+            if owner:
+                event = self._inflight = threading.Event()
+            else:
+                self.coalesced += 1
+        if owner:
+            if wait and timeout is None:
+                self._run(event)
+            else:
+                threading.Thread(target=self._run, args=(event,), name='snapshot-refresh',
+                                 daemon=True).start()
+        if wait:
+            event.wait(timeout)
+        return self.value
+
+    def _run(self, event):
+        try:
+            value = self.loader()
+            self._snapshot = (value, time.monotonic())
+            self.refreshes += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception(f"Snapshot refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def get(self):
+        """Return (value, age in seconds); never waits once a snapshot exists"""
+        if self._snapshot is None:
+            self.refresh(wait=True, timeout=self.first_wait)
+        elif self.is_stale():
+            self.refresh(wait=False)
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None, None
+        return snapshot[0], time.monotonic() - snapshot[1]
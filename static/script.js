@@ -4,7 +4,8 @@ class FakeNewsDetector {
     constructor() {
         this.initializeElements();
         this.bindEvents();
-        this.fetchNewsOnLoad();
+        this.articles = [];
+        this.subscribeToNews();
     }
 
     initializeElements() {
@@ -169,8 +170,7 @@ class FakeNewsDetector {
 
             const data = await response.json();
             // Flask returns { results: [...] }
-            this.displayNews(data.results);
-            this.updateNewsCount(data.results.length);
+            this.showArticles(data.results);
             this.showToast(`Fetched and analyzed ${data.results.length} news articles`, 'success');
 
         } catch (error) {
@@ -218,6 +218,11 @@ class FakeNewsDetector {
                         <i class="fas fa-clock"></i> ${publishedDate}
                     </span>
                 </div>
+                ${article.cluster_size > 1 ? `
+                    <div class="news-meta">
+                        <span class="news-source">Also reported by ${this.escapeHtml(article.sources.filter(s => s !== article.source).join(', '))}</span>
+                    </div>
+                ` : ''}
                 ${article.url ? `
                     <div style="margin-top: 0.5rem;">
                         <a href="${this.escapeHtml(article.url)}" target="_blank" rel="noopener noreferrer" style="color: #667eea; text-decoration: none; font-size: 0.9rem;">
@@ -241,12 +246,28 @@ class FakeNewsDetector {
         return div.innerHTML;
     }
 
-    // Fetch news on page load
-    async fetchNewsOnLoad() {
-        // Wait a bit for the page to settle
-        setTimeout(() => {
-            this.fetchRealTimeNews();
-        }, 1000);
+    // Receive newly scored articles as the server produces them
+    subscribeToNews() {
+        if (!window.EventSource) {
+            // Wait a bit for the page to settle
+            setTimeout(() => this.fetchRealTimeNews(), 1000);
+            return;
+        }
+        // The browser reconnects by itself and sends Last-Event-ID, so the
+        // server only replays what was missed
+        const stream = new EventSource(`${this.apiBase}/stream`);
+        const showAll = event => this.showArticles(JSON.parse(event.data));
+        stream.addEventListener('snapshot', showAll);
+        stream.addEventListener('reset', showAll);
+        stream.addEventListener('article', event => {
+            this.showArticles([JSON.parse(event.data), ...this.articles]);
+        });
+    }
+
+    showArticles(articles) {
+        this.articles = articles.slice(0, 10);
+        this.displayNews(this.articles);
+        this.updateNewsCount(this.articles.length);
     }
 
     // Format time ago
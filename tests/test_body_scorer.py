@@ -0,0 +1,176 @@
+"""BodyScorer against a local stub HTTP server and a stub detector.
+
+Run from the project root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body_scorer import BodyScorer, ParagraphExtractor
+
+ARTICLE = (b'<html><head><script>var x = "<p>not prose</p>";</script></head><body>'
+           b'<nav><p>menu</p></nav>'
+           + b''.join(b'<p>study finds growth in paragraph %d &amp; more</p>' % i for i in range(100))
+           + b'</body></html>')
+
+
+class StubDetector:
+    """Real when a text mentions a study; records how it was called"""
+
+    def __init__(self):
+        self.bundle = SimpleNamespace(version='v1')
+        self.calls = []
+
+    def predict_batch(self, headlines, **kwargs):
+        self.calls.append((list(headlines), kwargs))
+        return [{
+            'prediction': 'Real' if 'study' in text else 'Fake',
+            'confidence': 90.0,
+            'is_real': 'study' in text,
+            'model_version': self.bundle.version
+        } for text in headlines]
+
+
+class StubPages(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        StubPages.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/article':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_page(ARTICLE, 'text/html; charset=utf-8', etag='"v1"')
+        elif self.path == '/huge':
+            self.send_page(b'<p>' + b'word ' * 400000 + b'</p>', 'text/html')
+        elif self.path == '/slow':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            try:
+                for _ in range(50):
+                    self.wfile.write(b'<p>study shows growth</p>')
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                pass
+        elif self.path == '/plain':
+            self.send_page(b'plain words ' * 50, 'text/plain')
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def send_page(self, body, content_type, etag=None):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BodyScorerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubPages)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubPages.requests.clear()
+        self.detector = StubDetector()
+        self.scorer = BodyScorer(self.detector, deadline=0.5, max_bytes=200_000,
+                                 chunk_words=50, max_chunks=4, workers=2)
+
+    def score(self, path, title='Headline'):
+        return self.scorer.score({'url': self.base + path, 'title': title})
+
+    def test_scores_paragraph_text_in_chunks(self):
+        result = self.score('/article')
+        self.assertEqual(result['body']['words'], 200)
+        self.assertEqual(result['body']['chunks'], 4)
+        self.assertTrue(result['body']['truncated'])
+        self.assertEqual(result['body']['prediction'], 'Real')
+        self.assertEqual(result['headline']['prediction'], 'Fake')
+        headlines, kwargs = self.detector.calls[-1]
+        self.assertNotIn('menu', ' '.join(headlines))
+        self.assertNotIn('not prose', ' '.join(headlines))
+        # Body chunks stay out of the detector's headline cache
+        self.assertIs(kwargs.get('use_cache'), False)
+
+    def test_unchanged_page_is_revalidated_not_rescored(self):
+        first = self.score('/article')
+        second = self.score('/article')
+        self.assertEqual(StubPages.requests[-1], ('/article', '"v1"'))
+        self.assertEqual(len(self.detector.calls), 1)
+        self.assertEqual(first['content_hash'], second['content_hash'])
+        self.assertEqual(self.scorer.latest(self.base + '/article')['combined'], first['combined'])
+
+    def test_new_model_version_rescores(self):
+        self.score('/article')
+        self.detector.bundle.version = 'v2'
+        self.assertIsNone(self.scorer.latest(self.base + '/article'))
+        result = self.score('/article')
+        # Downloaded in full, without validators, and scored again
+        self.assertEqual(StubPages.requests[-1], ('/article', None))
+        self.assertEqual(result['model_version'], 'v2')
+
+    def test_byte_cap(self):
+        scorer = BodyScorer(self.detector, max_bytes=50_000, chunk_words=100_000, max_chunks=10)
+        result = scorer.score({'url': self.base + '/huge', 'title': 'x'})
+        self.assertTrue(result['body']['truncated'])
+        self.assertLess(result['body']['words'], 20_000)
+
+    def test_deadline_stops_a_trickling_server(self):
+        started = time.monotonic()
+        result = self.score('/slow')
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertTrue(result['body']['truncated'])
+
+    def test_plain_text(self):
+        self.assertEqual(self.score('/plain')['body']['words'], 100)
+
+    def test_errors_are_reported(self):
+        self.assertIn('error', self.score('/missing'))
+        self.assertIn('error', self.scorer.score({'url': 'ftp://example.com/x', 'title': 'x'}))
+
+    def test_concurrent_submits_share_one_future(self):
+        article = {'url': self.base + '/slow', 'title': 'x'}
+        future = self.scorer.submit(article)
+        self.assertIs(self.scorer.submit(article), future)
+        self.assertIn('body', future.result(timeout=5))
+
+
+class ParagraphExtractorTest(unittest.TestCase):
+    def test_plain_text_words_split_across_feeds(self):
+        extractor = ParagraphExtractor(100, plain_text=True)
+        for data in ('hel', 'lo wor', 'ld\nnext'):
+            extractor.feed(data)
+        extractor.close()
+        self.assertEqual(extractor.words, ['hello', 'world', 'next'])
+
+
+if __name__ == '__main__':
+    unittest.main()
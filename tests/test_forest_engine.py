@@ -0,0 +1,81 @@
+"""ArrayForest and CompiledTrees against the sklearn forest they came from.
+
+Run from the project root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import DELEGATE_MIN_ROWS, ArrayForest, CompiledTrees
+
+BATCH_SIZES = (1, DELEGATE_MIN_ROWS - 1, DELEGATE_MIN_ROWS, 2000)
+
+
+def sparse_rows(rng, n, n_features=300):
+    """TF-IDF-like rows: a few nonzero features each"""
+    return sp.random(n, n_features, density=0.02, format='csr', dtype=np.float64, random_state=rng)
+
+
+class ForestEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(0)
+        X = sparse_rows(rng, 3000)
+        # Noisy labels grow deep trees, the case the numpy traversal is slow on
+        y = np.where(rng.rand(3000) < 0.5, 'Fake', 'Real')
+        cls.forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        cls.X = sparse_rows(rng, max(BATCH_SIZES))
+
+    def assert_matches_sklearn(self, engine):
+        for size in BATCH_SIZES:
+            with self.subTest(rows=size):
+                X = self.X[:size]
+                np.testing.assert_allclose(engine.predict_proba(X), self.forest.predict_proba(X),
+                                           rtol=0, atol=1e-12)
+                np.testing.assert_array_equal(engine.predict(X), self.forest.predict(X))
+
+    def test_pickled_forest(self):
+        self.assert_matches_sklearn(ArrayForest.from_sklearn(self.forest, keep_delegate=True))
+
+    def test_arrays_only(self):
+        # As loaded from compiled artifacts: trees rebuilt from the arrays
+        engine = ArrayForest(**ArrayForest.from_sklearn(self.forest).arrays())
+        self.assert_matches_sklearn(engine)
+        self.assertIsInstance(engine.trees, CompiledTrees)
+
+    def test_numpy_traversal(self):
+        self.assert_matches_sklearn(ArrayForest(**ArrayForest.from_sklearn(self.forest).arrays(), trees=False))
+
+    def test_compiled_trees(self):
+        engine = ArrayForest.from_sklearn(self.forest)
+        for trees in (CompiledTrees.from_sklearn(self.forest), CompiledTrees.from_arrays(engine)):
+            for size in BATCH_SIZES:
+                with self.subTest(trees=trees, rows=size):
+                    X = self.X[:size]
+                    np.testing.assert_array_equal(trees.apply(X), self.forest.apply(X))
+
+    def test_small_batches_skip_the_sklearn_forest(self):
+        engine = ArrayForest.from_sklearn(self.forest, keep_delegate=True)
+        calls = []
+
+        class Recorder:
+            def apply(self, X):
+                calls.append(X.shape[0])
+                return engine.trees.apply(X)
+
+        engine.delegate = Recorder()
+        engine.predict_proba(self.X[:DELEGATE_MIN_ROWS - 1])
+        self.assertEqual(calls, [])
+        engine.predict_proba(self.X[:DELEGATE_MIN_ROWS])
+        self.assertEqual(calls, [DELEGATE_MIN_ROWS])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""NewsFetcher against the local stub feeds from benchmarks/stub_feeds.py.
+
+Run from the project root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from news_fetcher import NewsFetcher
+from stub_feeds import StubFeedServer
+
+# fetch_from_rss keeps the first five entries of each feed
+PER_FEED = 5
+
+
+def fetcher(urls, **kwargs):
+    news = NewsFetcher(dedup_threshold=None, **kwargs)
+    news.rss_feeds = list(urls)
+    return news
+
+
+class NewsFetcherTest(unittest.TestCase):
+    def stub(self, **kwargs):
+        stub = StubFeedServer(**kwargs).start()
+        self.addCleanup(stub.stop)
+        return stub
+
+    def test_cold_fetch(self):
+        stub = self.stub(feeds=4)
+        news = fetcher(stub.rss_urls)
+        articles = news.fetch_latest_news()
+        self.assertEqual(len(articles), 4 * PER_FEED)
+        self.assertEqual(stub.requests, 4)
+        self.assertEqual(news.pending_feeds, 0)
+        self.assertTrue(all(article['url'].startswith('https://stub.example/') for article in articles))
+
+    def test_not_modified_reuses_articles(self):
+        stub = self.stub(feeds=4)
+        news = fetcher(stub.rss_urls)
+        first = news.fetch_all_rss()
+        second = news.fetch_all_rss()
+        self.assertEqual(stub.requests, 8)
+        self.assertEqual(stub.not_modified, 4)
+        self.assertEqual(second, first)
+
+    def test_slow_feed_contributes_cached_articles(self):
+        fast = self.stub(feeds=2)
+        slow = self.stub(feeds=1, latency=0.6)
+        news = fetcher(fast.rss_urls + slow.rss_urls, refresh_timeout=0.3)
+
+        articles = news.fetch_latest_news()
+        # Nothing cached yet for the slow feed, and it is only slow: no sample news
+        self.assertEqual(len(articles), 2 * PER_FEED)
+        self.assertEqual(news.pending_feeds, 1)
+
+        # The late answer is kept; the next refresh misses the deadline
+        # again and falls back to it
+        time.sleep(0.6)
+        articles = news.fetch_latest_news()
+        self.assertEqual(news.pending_feeds, 1)
+        self.assertEqual(len(articles), 3 * PER_FEED)
+
+    def test_slow_host_does_not_starve_others(self):
+        slow = self.stub(feeds=40, latency=0.3)
+        fast = self.stub(feeds=4)
+        news = fetcher(slow.rss_urls + fast.rss_urls, per_host_limit=2, refresh_timeout=0.9)
+
+        started = time.monotonic()
+        articles = news.fetch_all_rss()
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(fast.requests, 4)
+        # Two slow feeds at a time: most of them are still queued
+        self.assertGreater(news.pending_feeds, 30)
+        self.assertEqual(len(articles), (44 - news.pending_feeds) * PER_FEED)
+
+
+if __name__ == '__main__':
+    unittest.main()